@@ -4,32 +4,45 @@ import pandas as pd
 import matplotlib.pyplot as plt
 from pprint import pprint
 from kisapi import KoreaInvestment
+from store import STORE, to_date
+from intraday import MINUTES, INGEST, market_of, first_crossing
+from dataclient import DataServiceClient
+from tracing import span
 from collections import defaultdict
 from datetime import datetime, timedelta, date
 
-def backtest(df):
-    df['ma5'] = df['close'].rolling(window=5).mean().shift(1)
+def backtest(df, intraday=None, k=0.5, window=5, fee=0.0005):
+    df['ma5'] = df['close'].rolling(window=window).mean().shift(1)
     df['noise'] = 1 - abs(df['open']-df['close']) / (df['high']-df['low'])
-    df['noise20'] = df['noise'].rolling(window=20).mean()[-2]
-    df['range'] = (df['high'] - df['low']) * 0.5
+    df['noise20'] = df['noise'].rolling(window=20).mean().iloc[-2]
+    df['range'] = (df['high'] - df['low']) * k
     df['target'] = df['open'] + df['range'].shift(1)
     df['bull'] = df['open'] > df['ma5']
 
-    fee = 0.0005
     df['ror'] = np.where((df['high'] > df['target']) & df['bull'], df['close'] / df['target'] - fee, 1)
 
+    if intraday is not None:
+        # 분봉이 있는 날은 고가가 목표가를 실제로 넘은 분의 가격으로 체결
+        crossing = first_crossing(df['target'], intraday)
+        covered = df.index.isin(crossing.index)
+        crossing = crossing.reindex(df.index)
+        filled = covered & crossing['entry'].notna() & df['bull']
+        df['ror'] = np.where(covered, np.where(filled, df['close'] / crossing['entry'] - fee, 1), df['ror'])
+        df['entry_time'] = crossing['entry_time'].where(filled)
+
     df['hpr'] = df['ror'].cumprod()
     df['dd'] = (df['hpr'].cummax() - df['hpr']) / df['hpr'].cummax() * 100
     return df
 
-def get_backtest_kor(kis, ticker, start, end):
-    column = ['open', 'high', 'low', 'close']
+def fetch_daily_kor(kis, ticker, start, end):
+    column = ['open', 'high', 'low', 'close', 'volume']
     data = defaultdict(list)
     dates = []
     flag = False
     while True:
         first = end-timedelta(days=100) if (end-start).days > 100 else start
-        res = kis.fetch_ohlcv(ticker, start_day=first.strftime('%Y%m%d'), end_day=end.strftime('%Y%m%d'))
+        with span("api", detailed=True):
+            res = kis.fetch_ohlcv(ticker, start_day=first.strftime('%Y%m%d'), end_day=end.strftime('%Y%m%d'))
         for ohlcv in res['output2']:
             try:
                 strdate = ohlcv['stck_bsop_date']
@@ -44,21 +57,53 @@ def get_backtest_kor(kis, ticker, start, end):
             data['high'].append(float(ohlcv['stck_hgpr']))
             data['low'].append(float(ohlcv['stck_lwpr']))
             data['close'].append(float(ohlcv['stck_clpr']))
+            data['volume'].append(float(ohlcv['acml_vol']))
         if flag:
             break
         end = first-timedelta(days=1)
         
-    df = pd.DataFrame(data, columns=column, index=dates).sort_index()
-    return backtest(df), res['output1']['hts_kor_isnm']
+    with span("dataframe", detailed=True):
+        df = pd.DataFrame(data, columns=column, index=dates).sort_index()
+    df.attrs['name'] = res['output1']['hts_kor_isnm']
+    return df
     
-def get_backtest_usa(kis, ticker, start, end):
-    column = ['open', 'high', 'low', 'close']
+def intraday_chunks(kis, ticker, df, start, end):
+    """ 분봉 수집은 백그라운드 작업으로 넘기고 지금까지 저장된 분봉만 읽는다
+    Returns:
+        tuple: (MinuteStore.iter_chunks 결과, 수집 상태 {'ingesting': 진행 중 여부, 'ingest_error': 실패 메시지})
+    """
+    job = INGEST.submit(kis, ticker, df.index)
+    status = {'ingesting': not job.done(), 'ingest_error': ""}
+    if job.done() and job.exception() is not None:
+        status['ingest_error'] = str(job.exception())
+    return MINUTES.iter_chunks(market_of(kis), ticker, to_date(start), to_date(end)), status
+
+def get_backtest_kor(kis, ticker, start, end, timeframe='D', intraday=False):
+    if kis.symbols:
+        ticker = kis.symbols.code(ticker)
+    if isinstance(kis, DataServiceClient):
+        with span("fetch", ticker=ticker):
+            df, name = kis.ohlcv(ticker, start, end, timeframe)
+        with span("backtest"):
+            return backtest(df), name
+    with span("fetch", ticker=ticker):
+        df = STORE.ohlcv(kis, ticker, start, end, fetch_daily_kor, timeframe)
+    name = kis.symbols.name(ticker) if kis.symbols and kis.symbols.get(ticker) else STORE.name(kis, ticker)
+    chunks, status = intraday_chunks(kis, ticker, df, start, end) if intraday and timeframe == 'D' else (None, {})
+    with span("backtest"):
+        df = backtest(df.copy(), chunks)
+    df.attrs.update(status)
+    return df, name
+
+def fetch_daily_usa(kis, ticker, start, end):
+    column = ['open', 'high', 'low', 'close', 'volume']
     data = defaultdict(list)
     dates = []
     flag = False
     while True:
         first = end-timedelta(days=100) if (end-start).days > 100 else start
-        res = kis.fetch_ohlcv(ticker, start_day=first.strftime('%Y%m%d'), end_day=end.strftime('%Y%m%d'))
+        with span("api", detailed=True):
+            res = kis.fetch_ohlcv(ticker, start_day=first.strftime('%Y%m%d'), end_day=end.strftime('%Y%m%d'))
         for ohlcv in res['output2']:
             strdate = ohlcv['xymd']
             yy, mm, dd = int(strdate[:4]), int(strdate[4:6]), int(strdate[6:8])
@@ -70,12 +115,30 @@ def get_backtest_usa(kis, ticker, start, end):
             data['high'].append(float(ohlcv['high']))
             data['low'].append(float(ohlcv['low']))
             data['close'].append(float(ohlcv['clos']))
+            data['volume'].append(float(ohlcv['tvol']))
         if flag:
             break
         end = first-timedelta(days=1)
         
-    df = pd.DataFrame(data, columns=column, index=dates).sort_index()
-    return backtest(df)
+    with span("dataframe", detailed=True):
+        df = pd.DataFrame(data, columns=column, index=dates).sort_index()
+    return df
+
+def get_backtest_usa(kis, ticker, start, end, timeframe='D', intraday=False):
+    if kis.symbols:
+        ticker = kis.symbols.code(ticker)
+    if isinstance(kis, DataServiceClient):
+        with span("fetch", ticker=ticker):
+            df, _ = kis.ohlcv(ticker, start, end, timeframe)
+        with span("backtest"):
+            return backtest(df)
+    with span("fetch", ticker=ticker):
+        df = STORE.ohlcv(kis, ticker, start, end, fetch_daily_usa, timeframe)
+    chunks, status = intraday_chunks(kis, ticker, df, start, end) if intraday and timeframe == 'D' else (None, {})
+    with span("backtest"):
+        df = backtest(df.copy(), chunks)
+    df.attrs.update(status)
+    return df
         
 
 if __name__ == "__main__":
@@ -88,4 +151,5 @@ if __name__ == "__main__":
     start = datetime(2021, 3, 1)
     end = datetime(2023, 5, 20)
     for ticker in tickers:
-        df = get_backtest(kis, ticker, start, end)
+        df = get_backtest_usa(kis, ticker, start, end)
+        print(ticker, round(df['hpr'].iloc[-2], 4), round(df['dd'].max(), 2))
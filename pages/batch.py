@@ -0,0 +1,187 @@
+""" 백테스트 일괄 실행 (Streamlit 없이)
+
+    python batch.py universe.txt --market kor --start 20190101 --end 20230101 --out results.parquet
+
+universe 파일은 한 줄에 종목 하나(또는 ticker 컬럼이 있는 CSV)이며,
+종목별 결과는 <out>.ckpt.jsonl에 바로 기록되어 중단 후 다시 실행하면 남은 종목만 실행한다.
+오류로 끝난 종목(호출 제한, 네트워크 오류 등)은 다시 실행할 때 재시도한다.
+체크포인트 첫 줄에는 실행 설정이 기록되며, 설정이 다르면 이어서 실행하지 않는다 (--fresh로 새로 시작).
+"""
+import os
+import json
+import argparse
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from kisapi import KoreaInvestment, RateLimiter
+from store import OHLCVStore, to_date
+from backtest import backtest, fetch_daily_kor, fetch_daily_usa
+
+
+EXCHANGE = {
+    "kor": "서울",
+    "usa": "미국전체"
+}
+
+# 체크포인트 첫 줄에 기록하는 실행 설정
+RUN_PARAMS = ["market", "start", "end", "timeframe", "k", "window", "fee"]
+
+RESULT_COLUMNS = ["ticker", "status", "error", "bars", "first", "last", "hpr", "mdd", "trades", "win_rate"]
+
+def read_universe(path):
+    """ 종목 리스트 파일 읽기 (txt: 한 줄에 하나, csv: ticker 컬럼) """
+    if path.endswith(".csv"):
+        return [str(ticker).strip() for ticker in pd.read_csv(path, dtype=str)['ticker']]
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+def run_params(args):
+    """ 결과에 영향을 주는 실행 설정 """
+    return {name: str(getattr(args, name)) for name in RUN_PARAMS}
+
+def read_checkpoint(path):
+    """ 체크포인트에 기록된 실행 설정과 종목별 결과
+    Returns:
+        tuple: (실행 설정 (없으면 None), {종목: 결과})
+    """
+    params, done = None, {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    continue    # 중단되며 잘린 마지막 줄
+                if 'params' in row:
+                    params = row['params']
+                else:
+                    done[row['ticker']] = row
+    return params, done
+
+def open_checkpoint(path, params, fresh=False):
+    """ 체크포인트를 이어 쓰도록 열기 (없거나 fresh면 설정을 첫 줄에 기록하고 새로 시작)
+    Returns:
+        tuple: (파일, {종목: 결과})
+    Raises:
+        ValueError: 체크포인트의 실행 설정이 params와 다른 경우
+    """
+    saved, done = (None, {}) if fresh else read_checkpoint(path)
+    if saved is None and not done:
+        f = open(path, "w", encoding="utf-8")
+        f.write(json.dumps({"params": params}, ensure_ascii=False) + "\n")
+        f.flush()
+        return f, {}
+    if saved != params:
+        raise ValueError(f"{path}는 다른 설정으로 실행한 결과입니다 ({saved}). --fresh로 새로 시작하거나 --out을 바꿔 주세요.")
+    return open(path, "a", encoding="utf-8"), done
+
+def remaining(tickers, done):
+    """ 아직 성공하지 못한 종목 (오류로 끝난 종목은 다시 실행) """
+    return [ticker for ticker in dict.fromkeys(tickers) if done.get(ticker, {}).get('status') != "ok"]
+
+def run_ticker(kis, store, exchange, ticker, args):
+    """ 종목 하나 백테스트
+    Returns:
+        dict: 결과 한 줄
+    """
+    row = {"ticker": ticker, "status": "ok", "error": ""}
+    try:
+        if kis is None:
+            df = store.cached(exchange, ticker, args.start, args.end, args.timeframe)
+            if df is None:
+                raise LookupError("캐시에 없는 종목입니다")
+        else:
+            fetch = fetch_daily_kor if exchange == "서울" else fetch_daily_usa
+            df = store.ohlcv(kis, ticker, args.start, args.end, fetch, args.timeframe)
+        if len(df) < 2:
+            raise ValueError("데이터가 부족합니다")
+
+        df = backtest(df.copy(), k=args.k, window=args.window, fee=args.fee)
+        traded = df['ror'] != 1
+        row.update(
+            bars=len(df),
+            first=str(df.index[0]),
+            last=str(df.index[-1]),
+            hpr=float(df['hpr'].iloc[-1]),
+            mdd=float(df['dd'].max()),
+            trades=int(traded.sum()),
+            win_rate=float((df['ror'][traded] > 1).mean()) if traded.any() else 0.0
+        )
+    except Exception as e:
+        row.update(status="error", error=str(e))
+    return row
+
+def summarize(results):
+    """ 전체 요약 통계 """
+    ok = results[results['status'] == "ok"]
+    return pd.DataFrame([{
+        "tickers": len(results),
+        "ok": len(ok),
+        "errors": len(results) - len(ok),
+        "hpr_mean": ok['hpr'].mean(),
+        "hpr_median": ok['hpr'].median(),
+        "mdd_mean": ok['mdd'].mean(),
+        "mdd_max": ok['mdd'].max(),
+        "profitable": (ok['hpr'] > 1).mean(),
+        "best": ok.loc[ok['hpr'].idxmax(), 'ticker'] if len(ok) else "",
+        "worst": ok.loc[ok['hpr'].idxmin(), 'ticker'] if len(ok) else ""
+    }])
+
+def write_table(df, path):
+    if path.endswith(".parquet"):
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="변동성 돌파 전략 일괄 백테스트")
+    parser.add_argument("universe", help="종목 리스트 파일 (.txt 또는 ticker 컬럼이 있는 .csv)")
+    parser.add_argument("--market", choices=EXCHANGE.keys(), default="kor")
+    parser.add_argument("--start", type=to_date, required=True, help="YYYYMMDD")
+    parser.add_argument("--end", type=to_date, required=True, help="YYYYMMDD")
+    parser.add_argument("--timeframe", default="D", help="D, W, M, Y 또는 N일봉(예: 5D)")
+    parser.add_argument("--k", type=float, default=0.5, help="변동성 돌파 계수")
+    parser.add_argument("--window", type=int, default=5, help="상승장 판단 이동평균 기간")
+    parser.add_argument("--fee", type=float, default=0.0005)
+    parser.add_argument("--out", default="results.parquet", help=".parquet 또는 .csv")
+    parser.add_argument("--cache", default=os.environ.get("OHLCV_STORE", "ohlcv.pkl"), help="일봉 캐시 파일")
+    parser.add_argument("--offline", action="store_true", help="API 호출 없이 캐시만 사용")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--calls-per-sec", type=int, default=None)
+    parser.add_argument("--real", action="store_true", help="실전투자 서버 사용")
+    parser.add_argument("--fresh", action="store_true", help="체크포인트를 지우고 처음부터 실행")
+    args = parser.parse_args()
+
+    exchange = EXCHANGE[args.market]
+    store = OHLCVStore(args.cache, autosave=False)
+    kis = None
+    if not args.offline:
+        kis = KoreaInvestment(api_key=os.environ.get("SIMUL_KEY"), api_secret=os.environ.get("SIMUL_SEC"),
+                              acc_no=os.environ.get("SIMUL_ACC"), exchange=exchange, mock=not args.real)
+        kis.set_rate_limiter(RateLimiter(args.calls_per_sec or (18 if args.real else 2)))
+
+    try:
+        ckpt, done = open_checkpoint(f"{args.out}.ckpt.jsonl", run_params(args), args.fresh)
+    except ValueError as e:
+        parser.error(str(e))
+    todo = remaining(read_universe(args.universe), done)
+    print(f"{sum(row['status'] == 'ok' for row in done.values())}개 완료, {len(todo)}개 남음")
+
+    with ckpt, ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(run_ticker, kis, store, exchange, ticker, args) for ticker in todo]
+        for i, future in enumerate(as_completed(futures), 1):
+            row = future.result()
+            ckpt.write(json.dumps(row, ensure_ascii=False) + "\n")
+            ckpt.flush()
+            done[row['ticker']] = row
+            if i % 50 == 0:
+                store.save()
+                print(f"{i}/{len(todo)}")
+    store.save()
+
+    results = pd.DataFrame(list(done.values()), columns=RESULT_COLUMNS)
+    summary = summarize(results)
+    write_table(results, args.out)
+    stem, ext = os.path.splitext(args.out)
+    write_table(summary, f"{stem}_summary{ext}")
+    print(summary.T.to_string(header=False))
@@ -0,0 +1,42 @@
+import requests
+import pandas as pd
+from datetime import date
+
+
+class DataServiceClient:
+    """ dataservice.py 프로세스에 조회를 맡기는 KoreaInvestment 대용 클라이언트 """
+
+    def __init__(self, url: str, exchange: str = "서울", symbols=None):
+        """ 생성자
+        Args:
+            url (str): 데이터 서비스 주소 (예: http://127.0.0.1:8765)
+            exchange (str): "서울" 또는 "미국전체"
+            symbols (SymbolMaster, optional): 종목 마스터
+        """
+        self.url = url.rstrip("/")
+        self.exchange = exchange
+        self.symbols = symbols
+        self.market = "kor" if exchange == "서울" else "usa"
+        self.session = requests.Session()
+
+    def get(self, path, **params):
+        resp = self.session.get(f"{self.url}/{path}", params=params)
+        data = resp.json()
+        if resp.status_code != 200:
+            raise ValueError(data.get("error", resp.status_code))
+        return data
+
+    def fetch_balance(self):
+        """ 잔고 조회 (KoreaInvestment.fetch_balance와 같은 형식) """
+        return self.get("balance", market=self.market)
+
+    def ohlcv(self, symbol: str, start, end, timeframe: str = 'D'):
+        """ 일/주/월/년봉 조회
+        Returns:
+            tuple: (DataFrame, 종목명)
+        """
+        data = self.get("ohlcv", market=self.market, symbol=symbol,
+                        start=start.strftime('%Y%m%d'), end=end.strftime('%Y%m%d'), timeframe=timeframe)
+        index = [date.fromisoformat(d) for d in data["index"]]
+        df = pd.DataFrame(data["data"], columns=data["columns"], index=index)
+        return df, data["name"]
@@ -0,0 +1,138 @@
+""" 시세 데이터 서비스
+
+KIS 클라이언트, 토큰, 호출 제한, OHLCV 캐시를 한 프로세스가 갖고
+모든 Streamlit 세션이 HTTP로 조회한다. 같은 요청이 동시에 들어오면 한 번만 호출한다.
+
+    python dataservice.py --port 8765
+"""
+import os
+import json
+import argparse
+import threading
+from concurrent.futures import Future
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from kisapi import KoreaInvestment, RateLimiter
+from symbols import SymbolMaster
+from store import STORE
+from backtest import fetch_daily_kor, fetch_daily_usa
+
+
+class SingleFlight:
+    """ 같은 키의 요청이 진행 중이면 새로 호출하지 않고 그 결과를 기다린다 """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, key, func):
+        with self.lock:
+            future = self.calls.get(key)
+            leader = future is None
+            if leader:
+                future = self.calls[key] = Future()
+        if not leader:
+            return future.result()
+
+        try:
+            future.set_result(func())
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self.lock:
+                del self.calls[key]
+        return future.result()
+
+
+class DataService:
+    """ 국내/해외 KIS 클라이언트를 하나씩 갖는 데이터 서비스 """
+
+    def __init__(self, api_key: str, api_secret: str, acc_no: str, mock: bool = True, calls_per_sec: int = None):
+        """ 생성자
+        Args:
+            calls_per_sec (int, optional): 초당 API 호출 수. 기본값은 모의투자 2, 실전 18
+        """
+        self.symbols = SymbolMaster().start()
+        self.limiter = RateLimiter(calls_per_sec or (2 if mock else 18))
+        self.flight = SingleFlight()
+        self.clients = {
+            "kor": KoreaInvestment(api_key=api_key, api_secret=api_secret, acc_no=acc_no, mock=mock, symbols=self.symbols),
+            "usa": KoreaInvestment(api_key=api_key, api_secret=api_secret, acc_no=acc_no, mock=mock, exchange="미국전체", symbols=self.symbols)
+        }
+        # 두 클라이언트가 하나의 호출 제한을 공유
+        for kis in self.clients.values():
+            kis.set_rate_limiter(self.limiter)
+
+    def client(self, market):
+        """ 시장별 클라이언트 (토큰이 만료되기 전에 다시 받는다. 두 클라이언트는 token.dat의 토큰 하나를 공유) """
+        kis = self.clients[market]
+        kis.refresh_access_token()
+        return kis
+
+    def ohlcv(self, market, symbol, start, end, timeframe='D'):
+        kis = self.client(market)
+        fetch = fetch_daily_kor if market == "kor" else fetch_daily_usa
+        df = STORE.ohlcv(kis, symbol, start, end, fetch, timeframe)
+        return {
+            "name": self.symbols.name(symbol) if self.symbols.get(symbol) else STORE.name(kis, symbol),
+            "columns": list(df.columns),
+            "index": [d.isoformat() for d in df.index],
+            "data": df.to_numpy().tolist()
+        }
+
+    def balance(self, market):
+        return self.client(market).fetch_balance()
+
+    def handle(self, path, query):
+        """ 요청 처리. 같은 경로와 인자의 요청은 SingleFlight로 묶는다 """
+        params = {k: v[0] for k, v in query.items()}
+        key = (path, tuple(sorted(params.items())))
+        if path == "/ohlcv":
+            return self.flight.do(key, lambda: self.ohlcv(
+                params["market"], params["symbol"], params["start"], params["end"], params.get("timeframe", "D")))
+        if path == "/balance":
+            return self.flight.do(key, lambda: self.balance(params["market"]))
+        raise KeyError(path)
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            try:
+                status, body = 200, service.handle(url.path, parse_qs(url.query))
+            except KeyError as e:
+                status, body = 404, {"error": f"잘못된 요청입니다: {e}"}
+            except Exception as e:
+                status, body = 500, {"error": str(e)}
+
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("content-type", "application/json; charset=utf-8")
+            self.send_header("content-length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+    return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="KIS 시세 데이터 서비스")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--real", action="store_true", help="실전투자 서버 사용")
+    parser.add_argument("--calls-per-sec", type=int, default=None)
+    args = parser.parse_args()
+
+    service = DataService(
+        api_key=os.environ.get("SIMUL_KEY"),
+        api_secret=os.environ.get("SIMUL_SEC"),
+        acc_no=os.environ.get("SIMUL_ACC"),
+        mock=not args.real,
+        calls_per_sec=args.calls_per_sec
+    )
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    print(f"data service listening on http://{args.host}:{args.port}")
+    server.serve_forever()
@@ -0,0 +1,129 @@
+import time
+import threading
+import pandas as pd
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from kisapi import RateLimiter
+
+
+Order = namedtuple("Order", ["symbol", "side", "quantity", "price"])
+
+RATE_LIMITED = "EGW00201"   # 초당 거래건수 초과
+
+def orders_from_rebalance(rb_df):
+    """ 리밸런싱 표(rebalancing_kor/usa의 rb_df)를 주문 리스트로 변환
+    Args:
+        rb_df (DataFrame): 종목코드, 현재가, 매수/매도 컬럼
+    Returns:
+        list: Order 리스트 (매도 먼저)
+    """
+    orders = []
+    for _, row in rb_df.iterrows():
+        quantity = int(row['매수/매도'])
+        if quantity == 0:
+            continue
+        price = float(str(row['현재가']).strip('$원').replace(',', ''))
+        orders.append(Order(row['종목코드'], 'buy' if quantity > 0 else 'sell', abs(quantity), price))
+    return sorted(orders, key=lambda order: order.side != 'sell')
+
+
+class PaperBroker:
+    """ 주문을 바로 체결시키는 로컬 대용 브로커 (KoreaInvestment의 주문/체결조회만 구현) """
+
+    def __init__(self, exchange: str = "서울", latency: float = 0.0):
+        """ 생성자
+        Args:
+            exchange (str): "서울" 또는 "미국전체"
+            latency (float): 주문 한 건당 흉내낼 지연(초)
+        """
+        self.exchange = exchange
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.orders = {}
+
+    def create_order(self, side: str, symbol: str, price: float, quantity: int, order_type: str = "00"):
+        time.sleep(self.latency)
+        with self.lock:
+            order_no = f"{len(self.orders) + 1:010d}"
+            self.orders[order_no] = (quantity, price)
+        return {"rt_cd": "0", "msg1": "주문이 완료되었습니다.", "output": {"ODNO": order_no}}
+
+    def fetch_order_fill(self, order_no: str):
+        quantity, price = self.orders.get(order_no, (0, 0.0))
+        return {"quantity": quantity, "filled": quantity, "price": price}
+
+
+def run_order(kis, order, limiter, order_type, poll, timeout):
+    """ 주문 한 건 제출 후 체결될 때까지 체결 현황 조회
+    Args:
+        limiter (RateLimiter | None): None이면 클라이언트 자체의 호출 제한을 따른다
+    Returns:
+        dict: 주문 결과와 제출/체결 지연(ms)
+    """
+    result = dict(order._asdict(), order_no="", status="", filled=0, fill_price=0.0, submit_ms=None, fill_ms=None, msg="")
+    start = time.perf_counter()
+    # 한 주문의 오류가 다른 주문의 제출과 결과 보고를 막지 않도록 예외는 모두 결과로 남긴다
+    try:
+        while True:
+            if limiter is not None:
+                limiter.acquire()
+            sent = time.perf_counter()
+            resp = kis.create_order(order.side, order.symbol, order.price, order.quantity, order_type)
+            result['submit_ms'] = (time.perf_counter() - sent) * 1000
+            result['msg'] = resp.get('msg1', '')
+            # 호출 제한으로 거부된 주문은 접수되지 않았으므로 timeout까지 다시 제출
+            if resp.get('msg_cd') != RATE_LIMITED or time.perf_counter() - start > timeout:
+                break
+            time.sleep(poll)
+        if resp.get('rt_cd') != '0':
+            result['status'] = "rejected"
+            return result
+        result['order_no'] = resp['output']['ODNO']
+    except Exception as e:
+        result.update(status="error", msg=str(e))
+        return result
+
+    while True:
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            fill = kis.fetch_order_fill(result['order_no'])
+            result.update(filled=fill['filled'], fill_price=fill['price'], msg=resp.get('msg1', ''))
+        except Exception as e:
+            # 체결조회 실패는 timeout까지 다시 조회
+            fill = None
+            result['msg'] = str(e)
+        if fill is not None and fill['filled'] >= order.quantity:
+            result.update(status="filled", fill_ms=(time.perf_counter() - start) * 1000)
+            return result
+        if time.perf_counter() - start > timeout:
+            if fill is None:
+                result['status'] = "error"
+            else:
+                result['status'] = "partial" if fill['filled'] else "open"
+            return result
+        time.sleep(poll)
+
+def execute_orders(kis, orders, calls_per_sec: int = 2, workers: int = 4, order_type: str = "00", poll: float = 1.0, timeout: float = 60.0):
+    """ 주문 일괄 실행
+    매도 주문을 먼저 동시에 제출하고 체결(또는 timeout)을 기다린 뒤 매수 주문을 제출한다.
+    주문과 체결조회는 하나의 호출 제한을 공유한다. 클라이언트에 set_rate_limiter로 호출 제한이 걸려 있으면
+    (main.py처럼 조회와 함께 공유하는 limiter) 그 제한을 그대로 따른다.
+    Args:
+        kis (KoreaInvestment | PaperBroker): 주문 클라이언트
+        orders (list): Order 리스트
+        calls_per_sec (int): 클라이언트에 호출 제한이 없을 때의 초당 호출 수 (모의투자 2, 실전 약 18)
+        workers (int): 동시에 처리할 주문 수
+        order_type (str): "00": 지정가, "01": 시장가 (국내만)
+        poll (float): 체결조회 간격(초)
+        timeout (float): 주문당 체결 대기 시간(초)
+    Returns:
+        DataFrame: 주문별 결과 (status, filled, fill_price, submit_ms, fill_ms, msg)
+    """
+    limiter = None if getattr(kis, "limiter", None) else RateLimiter(calls_per_sec)
+    results = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for side in ('sell', 'buy'):
+            group = [order for order in orders if order.side == side]
+            results.extend(pool.map(lambda order: run_order(kis, order, limiter, order_type, poll, timeout), group))
+    return pd.DataFrame(results)
@@ -0,0 +1,307 @@
+import os
+import json
+import datetime
+import threading
+import numpy as np
+import pandas as pd
+from zoneinfo import ZoneInfo
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+
+MINUTE_COLUMNS = ['time', 'open', 'high', 'low', 'close', 'volume']
+
+def market_of(kis):
+    return "kor" if kis.exchange == "서울" else "usa"
+
+def market_today(market):
+    """ 거래소 현지 날짜 (이 날짜부터는 장이 끝나지 않았을 수 있다) """
+    return datetime.datetime.now(ZoneInfo("Asia/Seoul" if market == "kor" else "America/New_York")).date()
+
+def check(res):
+    """ KIS 오류 응답(EGW00201 초당 거래건수 초과 등)이면 ValueError
+    오류 응답에는 output2가 없어 빈 결과와 구별되지 않으므로 페이지를 넘기기 전에 확인한다.
+    """
+    if res.get('rt_cd') != '0':
+        raise ValueError(f"분봉 조회 실패: [{res.get('msg_cd', '')}] {res.get('msg1', '')}")
+    return res
+
+def minute_frame(data):
+    return pd.DataFrame(data, columns=MINUTE_COLUMNS).drop_duplicates('time').sort_values('time', ignore_index=True)
+
+def fetch_minutes_kor(kis, ticker, day):
+    """ 국내 종목의 하루치 1분봉 (장 마감부터 120개씩 거슬러 올라가며 조회)
+    Args:
+        day (date): 조회일자
+    Returns:
+        DataFrame: MINUTE_COLUMNS
+    """
+    data = defaultdict(list)
+    strday = day.strftime('%Y%m%d')
+    hour = "153000"
+    while True:
+        res = check(kis.fetch_minute_ohlcv(ticker, day=strday, hour=hour))
+        rows = [row for row in res.get('output2', []) if row.get('stck_bsop_date') == strday]
+        if not rows:
+            break
+        for row in rows:
+            data['time'].append(datetime.datetime.strptime(strday + row['stck_cntg_hour'], '%Y%m%d%H%M%S'))
+            data['open'].append(float(row['stck_oprc']))
+            data['high'].append(float(row['stck_hgpr']))
+            data['low'].append(float(row['stck_lwpr']))
+            data['close'].append(float(row['stck_prpr']))
+            data['volume'].append(float(row['cntg_vol']))
+        earliest = min(data['time'])
+        if earliest.strftime('%H%M%S') <= "090000":
+            break
+        hour = (earliest - datetime.timedelta(minutes=1)).strftime('%H%M%S')
+
+    return minute_frame(data)
+
+def fetch_minutes_usa(kis, ticker, start, end, save):
+    """ 해외 종목의 [start, end] 1분봉 (end 다음날부터 start까지 거슬러 올라가며 연속조회)
+    한 달치를 다 받을 때마다 save로 넘겨 메모리를 한 달치로 제한한다.
+    Args:
+        start (date): 조회시작일자 (현지 기준)
+        end (date): 조회종료일자 (현지 기준)
+        save (callable): save(DataFrame) - 한 달치 MINUTE_COLUMNS (현지 시각, 최근 달부터)
+    Returns:
+        date: 이 날짜 이후는 끝까지 받았다 (조회 가능한 기간이 start 전에 끝나면 start보다 늦다)
+    """
+    data = defaultdict(list)
+    next_key = (end + datetime.timedelta(days=1)).strftime('%Y%m%d') + "000000"
+    exhausted = False
+    while True:
+        res = check(kis.fetch_minute_ohlcv(ticker, next_key=next_key))
+        rows = res.get('output2') or []
+        if not rows:
+            exhausted = True
+            break
+        for row in rows:
+            stamp = datetime.datetime.strptime(row['xymd'] + row['xhms'], '%Y%m%d%H%M%S')
+            if data['time'] and (stamp.year, stamp.month) != (data['time'][-1].year, data['time'][-1].month):
+                save(minute_frame(data))
+                data = defaultdict(list)
+            data['time'].append(stamp)
+            data['open'].append(float(row['open']))
+            data['high'].append(float(row['high']))
+            data['low'].append(float(row['low']))
+            data['close'].append(float(row['last']))
+            data['volume'].append(float(row['evol']))
+        key = rows[-1]['xymd'] + rows[-1]['xhms']
+        if data['time'][-1].date() < start:
+            break
+        if key == next_key:
+            exhausted = True
+            break
+        next_key = key
+
+    df = minute_frame(data)
+    if not exhausted:
+        save(df)
+        return start
+    if df.empty:
+        return end + datetime.timedelta(days=1)
+    # 조회 가능한 기간이 끝났으면 가장 이른 날은 일부만 받았을 수 있다
+    oldest = df['time'].dt.date.min()
+    save(df[df['time'].dt.date > oldest])
+    return oldest + datetime.timedelta(days=1)
+
+
+class MinuteStore:
+    """ 1분봉 저장소
+
+    종목별로 월 단위 parquet 파일(zstd 압축)에 나눠 저장하고,
+    읽을 때는 기간에 해당하는 월 파일만 하나씩 읽어 메모리를 한 달치로 제한한다.
+    """
+
+    def __init__(self, root: str = "minutes"):
+        """ 생성자
+        Args:
+            root (str): 저장 디렉토리 (root/시장/종목/YYYY-MM.parquet)
+        """
+        self.root = root
+
+    def partition(self, market, symbol, month):
+        return os.path.join(self.root, market, symbol, f"{month}.parquet")
+
+    def months(self, start, end):
+        return [str(p) for p in pd.period_range(start, end, freq='M')]
+
+    def empty_path(self, market, symbol):
+        return os.path.join(self.root, market, symbol, "empty.json")
+
+    def empty_days(self, market, symbol):
+        """ 조회했지만 분봉이 없던 거래일 """
+        path = self.empty_path(market, symbol)
+        if not os.path.exists(path):
+            return set()
+        with open(path, encoding="utf-8") as f:
+            return {datetime.date.fromisoformat(day) for day in json.load(f)}
+
+    def mark_empty(self, market, symbol, days):
+        """ 분봉이 없는 거래일로 기록해 다시 조회하지 않는다 """
+        if not days:
+            return
+        days = self.empty_days(market, symbol) | set(days)
+        path = self.empty_path(market, symbol)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(sorted(day.isoformat() for day in days), f)
+        os.replace(path + ".tmp", path)
+
+    def write(self, market, symbol, df):
+        """ 분봉을 월별 파일에 병합 저장 """
+        if df.empty:
+            return
+        for month, part in df.groupby(df['time'].dt.strftime('%Y-%m')):
+            path = self.partition(market, symbol, month)
+            if os.path.exists(path):
+                part = pd.concat([pd.read_parquet(path), part])
+                part = part.drop_duplicates('time', keep='last').sort_values('time', ignore_index=True)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 백그라운드 수집 중에도 읽는 쪽이 쓰다 만 파일을 보지 않도록 바꿔치기
+            part.to_parquet(path + ".tmp", compression='zstd', index=False)
+            os.replace(path + ".tmp", path)
+
+    def iter_chunks(self, market, symbol, start, end):
+        """ [start, end] 구간의 분봉을 월 단위로 읽기
+        Yields:
+            DataFrame: 한 달치 분봉
+        """
+        for month in self.months(start, end):
+            path = self.partition(market, symbol, month)
+            if not os.path.exists(path):
+                continue
+            df = pd.read_parquet(path)
+            days = df['time'].dt.date
+            yield df[(days >= start) & (days <= end)]
+
+    def stored_days(self, market, symbol, start, end):
+        """ 저장된 거래일 (분봉이 없던 날 포함) """
+        days = {day for day in self.empty_days(market, symbol) if start <= day <= end}
+        for month in self.months(start, end):
+            path = self.partition(market, symbol, month)
+            if os.path.exists(path):
+                days.update(pd.read_parquet(path, columns=['time'])['time'].dt.date)
+        return days
+
+    def ingest(self, kis, symbol, days):
+        """ 저장되지 않은 거래일의 분봉만 받아 저장
+        장이 끝난 거래일만, 하루치를 끝까지 받은 경우에만 저장한다.
+        조회가 실패하면 그때까지 다 받은 날만 저장하고 예외를 다시 던진다.
+        분봉 조회 가능 기간 안에서 분봉이 없던 날만 빈 날로 기록한다.
+        Args:
+            kis (KoreaInvestment): API 클라이언트
+            symbol (str): 종목코드
+            days (list): 받아야 할 거래일 (일봉 인덱스 등)
+        """
+        market = market_of(kis)
+        days = sorted(day for day in days if day < market_today(market))
+        if not days:
+            return
+        stored = self.stored_days(market, symbol, days[0], days[-1])
+        if all(day in stored for day in days):
+            return
+
+        if market == "usa":
+            # 저장되지 않은 연속 구간마다 그 구간만 연속조회하고, 한 달치씩 끝날 때마다 저장
+            for run in missing_runs(days, stored):
+                received = set()
+                def save(df):
+                    df = df[df['time'].dt.date.isin(run)]
+                    received.update(df['time'].dt.date)
+                    self.write(market, symbol, df)
+                served = fetch_minutes_usa(kis, symbol, run[0], run[-1], save)
+                self.mark_empty(market, symbol, [day for day in run if day >= served and day not in received])
+            return
+
+        # 한 달치씩 모아서 저장해 메모리를 제한
+        missing = [day for day in days if day not in stored]
+        buffer, empty = [], []
+        served = False      # 분봉을 받은 날 이전의 빈 날은 조회 가능 기간 밖일 수 있다
+        try:
+            for i, day in enumerate(missing):
+                df = fetch_minutes_kor(kis, symbol, day)
+                if not df.empty:
+                    buffer.append(df)
+                    served = True
+                elif served:
+                    empty.append(day)
+                if buffer and (i == len(missing) - 1 or (missing[i + 1].year, missing[i + 1].month) != (day.year, day.month)):
+                    self.write(market, symbol, pd.concat(buffer))
+                    buffer = []
+        finally:
+            if buffer:
+                self.write(market, symbol, pd.concat(buffer))
+            self.mark_empty(market, symbol, empty)
+
+
+def missing_runs(days, stored):
+    """ 거래일 중 저장되지 않은 날이 연속된 구간들 """
+    runs, run = [], []
+    for day in days:
+        if day in stored:
+            if run:
+                runs.append(run)
+            run = []
+        else:
+            run.append(day)
+    if run:
+        runs.append(run)
+    return runs
+
+
+class IngestJobs:
+    """ 분봉 수집을 백그라운드에서 실행 (Streamlit 실행을 막지 않도록)
+    같은 종목의 수집은 하나만 돌고, 끝나거나 실패한 뒤 다시 요청하면 남은 날만 다시 받는다.
+    """
+
+    def __init__(self, store, workers: int = 1):
+        self.store = store
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.lock = threading.Lock()
+        self.jobs = {}      # (시장, 종목) -> Future
+
+    def submit(self, kis, symbol, days):
+        """ 수집 작업 시작 (진행 중이면 그 작업)
+        Returns:
+            Future: MinuteStore.ingest 작업
+        """
+        key = (market_of(kis), symbol)
+        with self.lock:
+            job = self.jobs.get(key)
+            if job is None or job.done():
+                job = self.jobs[key] = self.executor.submit(self.store.ingest, kis, symbol, list(days))
+        return job
+
+
+def first_crossing(target, chunks):
+    """ 날짜별로 분봉 고가가 목표가를 처음 넘은 분과 체결가
+    Args:
+        target (Series): 날짜별 목표가
+        chunks (iterable): MinuteStore.iter_chunks 결과
+    Returns:
+        DataFrame: 분봉이 있는 날짜별 entry (체결가, 없으면 NaN), entry_time
+    """
+    result = []
+    for df in chunks:
+        if df.empty:
+            continue
+        day = df['time'].dt.date
+        tg = day.map(target)
+        crossed = df[df['high'] > tg]
+        first = crossed.groupby(day[crossed.index]).head(1)
+        # 분봉 시가가 이미 목표가 위면 시가에 체결
+        out = pd.DataFrame({
+            'entry': np.maximum(first['open'].to_numpy(), tg[first.index].to_numpy()),
+            'entry_time': first['time'].to_numpy()
+        }, index=day[first.index].to_numpy())
+        result.append(out.reindex(pd.unique(day)))
+    if not result:
+        return pd.DataFrame({'entry': pd.Series(dtype=float), 'entry_time': pd.Series(dtype='datetime64[ns]')})
+    return pd.concat(result)
+
+
+MINUTES = MinuteStore(os.environ.get("MINUTE_STORE", "minutes"))
+INGEST = IngestJobs(MINUTES)
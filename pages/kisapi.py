@@ -1,7 +1,11 @@
 import json
+import time
 import pickle
 import requests
 import datetime
+import functools
+import threading
+from symbols import ORDER_EXCHANGE
 
 
 # 해외주식 주문, 잔고
@@ -31,10 +35,61 @@ CURRENCY_CODE = {
     "호치민": "VND"
 }
 
+# token.dat을 함께 쓰는 클라이언트들이 토큰을 한 번만 발급받도록
+TOKEN_LOCK = threading.Lock()
+
+# 호출 제한 대상 API 호출 메서드 (주문, 체결조회 포함)
+API_METHODS = [
+    "fetch_domestic_price",
+    "fetch_oversea_price",
+    "fetch_balance_domestic",
+    "fetch_balance_oversea",
+    "fetch_present_balance",
+    "fetch_oversea_day_night",
+    "fetch_ohlcv_domestic",
+    "fetch_ohlcv_overesea",
+    "fetch_minute_ohlcv_domestic",
+    "fetch_minute_ohlcv_oversea",
+    "create_domestic_order",
+    "create_oversea_order",
+    "fetch_domestic_order_fill",
+    "fetch_oversea_order_fill"
+]
+
+class RateLimiter:
+    """ API 호출 수 제한 (호출 간격을 고르게 벌린다) """
+
+    def __init__(self, calls: int, period: float = 1.0):
+        """ 생성자
+        Args:
+            calls (int): period 동안 허용되는 호출 수
+            period (float): 기준 시간(초)
+        """
+        self.interval = period / calls
+        self.lock = threading.Lock()
+        self.next_call = 0.0
+
+    def acquire(self):
+        """ 다음 호출 가능 시점까지 대기 """
+        with self.lock:
+            now = time.monotonic()
+            wait = self.next_call - now
+            self.next_call = max(now, self.next_call) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+    def wrap(self, func):
+        """ 호출 전에 acquire 하는 함수로 감싸기 """
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            self.acquire()
+            return func(*args, **kwargs)
+        return wrapper
+
 class KoreaInvestment:
     """ 한국투자증권 REST API """
 
-    def __init__(self, api_key: str, api_secret: str, acc_no: str, exchange: str = "서울", mock: bool = False):
+    def __init__(self, api_key: str, api_secret: str, acc_no: str, exchange: str = "서울", mock: bool = False, symbols=None):
         """ 생성자
         Args:
             api_key (str): 발급받은 API key
@@ -42,6 +97,7 @@ class KoreaInvestment:
             acc_no (str): 계좌번호 체계의 앞 8자리-뒤 2자리
             exchange (str): "서울", "나스닥", "뉴욕", "아멕스", "홍콩", "상해", "심천", "도쿄", "하노이", "호치민"
             mock (bool): True (mock trading), False (real trading)
+            symbols (SymbolMaster, optional): 종목 마스터. 해외 종목의 거래소 코드 조회에 사용
         """
 
         self.mock = mock
@@ -55,13 +111,13 @@ class KoreaInvestment:
         self.acc_no_postfix = acc_no.split('-')[1]
 
         self.exchange = exchange
+        self.symbols = symbols
+        self.limiter = None
 
         # access token
         self.access_token = None
-        if self.check_access_token():
-            self.load_access_token()
-        else:
-            self.issue_access_token()
+        self.token_expire = 0
+        self.refresh_access_token()
 
     def set_base_url(self, mock: bool = True):
         """ 테스트(모의투자) 서버 사용 설정
@@ -93,6 +149,7 @@ class KoreaInvestment:
         # add extra information for the token verification
         now = datetime.datetime.now()
         resp_data['timestamp'] = int(now.timestamp()) + resp_data["expires_in"]
+        self.token_expire = resp_data['timestamp']
         resp_data['api_key'] = self.api_key
         resp_data['api_secret'] = self.api_secret
 
@@ -100,8 +157,10 @@ class KoreaInvestment:
         with open("token.dat", "wb") as f:
             pickle.dump(resp_data, f)
 
-    def check_access_token(self):
+    def check_access_token(self, margin: int = 0):
         """ check access token
+        Args:
+            margin (int): 만료까지 이 시간(초)보다 적게 남았으면 유효하지 않은 것으로 본다
         Returns:
             Bool: True: token is valid, False: token is not valid
         """
@@ -114,7 +173,7 @@ class KoreaInvestment:
             now_epoch = int(datetime.datetime.now().timestamp())
             status = False
 
-            if ((now_epoch - expire_epoch > 0) or
+            if ((now_epoch + margin - expire_epoch > 0) or
                 (data['api_key'] != self.api_key) or
                     (data['api_secret'] != self.api_secret)):
                 status = False
@@ -129,6 +188,20 @@ class KoreaInvestment:
         with open("token.dat", "rb") as f:
             data = pickle.load(f)
             self.access_token = f'Bearer {data["access_token"]}'
+            self.token_expire = data['timestamp']
+
+    def refresh_access_token(self, margin: int = 10 * 60):
+        """ 토큰이 없거나 만료가 margin(초) 안으로 다가오면 다시 받는다
+        같은 token.dat을 쓰는 다른 클라이언트가 먼저 새 토큰을 받았으면 그 토큰을 불러와 함께 쓴다.
+        오래 떠 있는 프로세스(dataservice.py 등)는 API 호출 전에 부른다.
+        """
+        if time.time() < self.token_expire - margin:
+            return
+        with TOKEN_LOCK:
+            if self.check_access_token(margin):
+                self.load_access_token()
+            else:
+                self.issue_access_token()
 
     def fetch_price(self, symbol: str):
         """ 
@@ -190,7 +263,7 @@ class KoreaInvestment:
         }
 
         # query parameter
-        exchange_code = EXCHANGE_CODE[self.exchange]
+        exchange_code = self.quote_exchange_code(symbol, EXCHANGE_CODE[self.exchange])
         params = {
             "AUTH": "",
             "EXCD": exchange_code,
@@ -199,6 +272,27 @@ class KoreaInvestment:
         resp = requests.get(url, headers=headers, params=params)
         return resp.json()
 
+    def set_rate_limiter(self, limiter: RateLimiter):
+        """ 모든 조회 API 호출 전에 limiter를 거치도록 설정 (여러 클라이언트가 하나의 limiter 공유 가능)
+        Args:
+            limiter (RateLimiter): 호출 제한
+        """
+        self.limiter = limiter
+        for method in API_METHODS:
+            setattr(self, method, limiter.wrap(getattr(type(self), method).__get__(self)))
+
+    def quote_exchange_code(self, symbol: str, default: str):
+        """ 해외 시세 조회용 거래소 코드 (NAS, NYS, AMS)
+        Args:
+            symbol (str): 종목코드
+            default (str): 종목 마스터에 없을 때 사용할 코드
+        Returns:
+            str: 거래소 코드
+        """
+        if self.symbols is None:
+            return default
+        return self.symbols.exchange(symbol, default)
+
     def fetch_balance(self):
         """ 잔고 조회
         Returns:
@@ -494,8 +588,7 @@ class KoreaInvestment:
             now = datetime.datetime.now()
             end_day = now.strftime("%Y%m%d")
 
-        # exchange_code = EXCHANGE_CODE[self.exchange]
-        exchange_code = "NAS"
+        exchange_code = self.quote_exchange_code(symbol, "NAS")
 
         params = {
             "AUTH": "",
@@ -507,3 +600,277 @@ class KoreaInvestment:
         }
         resp = requests.get(url, headers=headers, params=params)
         return resp.json()
+
+    def fetch_minute_ohlcv(self, symbol: str, day: str = "", hour: str = "", next_key: str = ""):
+        """ fetch 1분봉
+        Args:
+            symbol (str): 종목코드
+            day (str): 조회일자 (YYYYMMDD, 국내)
+            hour (str): 조회기준시각 (HHMMSS, 국내). 이 시각 이전 분봉을 최대 120개 조회
+            next_key (str): 연속조회키 (YYYYMMDDHHMMSS, 해외)
+        Returns:
+            dict: _description_
+        """
+        if self.exchange == '서울':
+            return self.fetch_minute_ohlcv_domestic(symbol, day, hour)
+        else:
+            return self.fetch_minute_ohlcv_oversea(symbol, next_key)
+
+    def fetch_minute_ohlcv_domestic(self, symbol: str, day: str = "", hour: str = ""):
+        """ 국내주식시세/주식일별분봉조회
+        Args:
+            symbol (str): 종목코드
+            day (str, optional): 조회일자(YYYYMMDD). 기본값은 오늘
+            hour (str, optional): 조회기준시각(HHMMSS). 기본값은 장 마감 153000
+        """
+        path = "/uapi/domestic-stock/v1/quotations/inquire-time-dailychartprice"
+        url = f"{self.base_url}/{path}"
+
+        headers = {
+            "content-type": "application/json",
+            "authorization": self.access_token,
+            "appKey": self.api_key,
+            "appSecret": self.api_secret,
+            "tr_id": "FHKST03010230"
+        }
+
+        if day == "":
+            now = datetime.datetime.now()
+            day = now.strftime("%Y%m%d")
+
+        params = {
+            "FID_COND_MRKT_DIV_CODE": "J",
+            "FID_INPUT_ISCD": symbol,
+            "FID_INPUT_HOUR_1": hour or "153000",
+            "FID_INPUT_DATE_1": day,
+            "FID_PW_DATA_INCU_YN": "Y",
+            "FID_FAKE_TICK_INCU_YN": ""
+        }
+        resp = requests.get(url, headers=headers, params=params)
+        return resp.json()
+
+    def fetch_minute_ohlcv_oversea(self, symbol: str, next_key: str = "", nrec: int = 120):
+        """ 해외주식현재가/해외주식분봉조회
+        Args:
+            symbol (str): 종목코드
+            next_key (str, optional): 연속조회키 (직전 응답의 마지막 분봉 xymd + xhms). 빈 값이면 최근부터
+            nrec (int, optional): 요청 갯수 (최대 120)
+        """
+        path = "/uapi/overseas-price/v1/quotations/inquire-time-itemchartprice"
+        url = f"{self.base_url}/{path}"
+
+        headers = {
+            "content-type": "application/json",
+            "authorization": self.access_token,
+            "appKey": self.api_key,
+            "appSecret": self.api_secret,
+            "tr_id": "HHDFS76950200"
+        }
+
+        exchange_code = self.quote_exchange_code(symbol, "NAS")
+
+        params = {
+            "AUTH": "",
+            "EXCD": exchange_code,
+            "SYMB": symbol,
+            "NMIN": "1",
+            "PINC": "1",
+            "NEXT": "1" if next_key else "",
+            "NREC": str(nrec),
+            "FILL": "",
+            "KEYB": next_key
+        }
+        resp = requests.get(url, headers=headers, params=params)
+        return resp.json()
+
+    def create_order(self, side: str, symbol: str, price: float, quantity: int, order_type: str = "00"):
+        """ 주문
+        Args:
+            side (str): "buy" 또는 "sell"
+            symbol (str): 종목코드
+            price (float): 주문가격 (국내 시장가 주문이면 0)
+            quantity (int): 주문수량
+            order_type (str): "00": 지정가, "01": 시장가 (국내만)
+        Returns:
+            dict: API 개발 가이드 참조 (output.ODNO: 주문번호)
+        """
+        if self.exchange == "서울":
+            return self.create_domestic_order(side, symbol, price, quantity, order_type)
+        else:
+            return self.create_oversea_order(side, symbol, price, quantity)
+
+    def create_domestic_order(self, side: str, symbol: str, price: float, quantity: int, order_type: str = "00"):
+        """ 국내주식주문/주식주문(현금)
+        Args:
+            side (str): "buy" 또는 "sell"
+            symbol (str): 종목코드
+            price (float): 주문단가
+            quantity (int): 주문수량
+            order_type (str): "00": 지정가, "01": 시장가
+        """
+        path = "uapi/domestic-stock/v1/trading/order-cash"
+        url = f"{self.base_url}/{path}"
+
+        if self.mock:
+            tr_id = "VTTC0802U" if side == "buy" else "VTTC0801U"
+        else:
+            tr_id = "TTTC0802U" if side == "buy" else "TTTC0801U"
+
+        headers = {
+            "content-type": "application/json",
+            "authorization": self.access_token,
+            "appKey": self.api_key,
+            "appSecret": self.api_secret,
+            "tr_id": tr_id
+        }
+        data = {
+            "CANO": self.acc_no_prefix,
+            "ACNT_PRDT_CD": self.acc_no_postfix,
+            "PDNO": symbol,
+            "ORD_DVSN": order_type,
+            "ORD_QTY": str(quantity),
+            "ORD_UNPR": "0" if order_type == "01" else str(int(price))
+        }
+        resp = requests.post(url, headers=headers, data=json.dumps(data))
+        return resp.json()
+
+    def create_oversea_order(self, side: str, symbol: str, price: float, quantity: int):
+        """ 해외주식주문/해외주식 주문 (미국, 지정가)
+        Args:
+            side (str): "buy" 또는 "sell"
+            symbol (str): 종목코드
+            price (float): 주문단가
+            quantity (int): 주문수량
+        """
+        path = "uapi/overseas-stock/v1/trading/order"
+        url = f"{self.base_url}/{path}"
+
+        if self.mock:
+            tr_id = "VTTT1002U" if side == "buy" else "VTTT1001U"
+        else:
+            tr_id = "JTTT1002U" if side == "buy" else "JTTT1006U"
+
+        headers = {
+            "content-type": "application/json",
+            "authorization": self.access_token,
+            "appKey": self.api_key,
+            "appSecret": self.api_secret,
+            "tr_id": tr_id
+        }
+
+        # 시세 거래소 코드(NAS)를 주문 거래소 코드(NASD)로
+        exchange_code = self.quote_exchange_code(symbol, None)
+        exchange_code = ORDER_EXCHANGE.get(exchange_code, EXCHANGE_CODE[self.exchange])
+
+        data = {
+            "CANO": self.acc_no_prefix,
+            "ACNT_PRDT_CD": self.acc_no_postfix,
+            "OVRS_EXCG_CD": exchange_code,
+            "PDNO": symbol,
+            "ORD_QTY": str(quantity),
+            "OVRS_ORD_UNPR": f"{price:.2f}",
+            "ORD_SVR_DVSN_CD": "0",
+            "ORD_DVSN": "00"
+        }
+        resp = requests.post(url, headers=headers, data=json.dumps(data))
+        return resp.json()
+
+    def fetch_order_fill(self, order_no: str):
+        """ 오늘 주문의 체결 현황
+        Args:
+            order_no (str): 주문번호
+        Returns:
+            dict: quantity (주문수량), filled (체결수량), price (평균체결가)
+        """
+        if self.exchange == "서울":
+            resp = self.fetch_domestic_order_fill(order_no)
+            row = self.find_order(resp, 'output1', order_no)
+            if row is None:
+                return {"quantity": 0, "filled": 0, "price": 0.0}
+            return {"quantity": int(row['ord_qty']), "filled": int(row['tot_ccld_qty']), "price": float(row['avg_prvs'] or 0)}
+        else:
+            resp = self.fetch_oversea_order_fill(order_no)
+            row = self.find_order(resp, 'output', order_no)
+            if row is None:
+                return {"quantity": 0, "filled": 0, "price": 0.0}
+            return {"quantity": int(row['ft_ord_qty']), "filled": int(row['ft_ccld_qty']), "price": float(row['ft_ccld_unpr3'] or 0)}
+
+    def find_order(self, resp, output, order_no):
+        """ 체결조회 응답에서 주문번호가 같은 행 (조회 조건만으로는 그 주문 하나만 온다는 보장이 없다)
+        Raises:
+            ValueError: 오류 응답
+        """
+        if resp.get('rt_cd') != '0':
+            raise ValueError(f"체결 조회 실패: [{resp.get('msg_cd', '')}] {resp.get('msg1', '')}")
+        for row in resp.get(output) or []:
+            if row.get('odno', '').lstrip('0') == order_no.lstrip('0'):
+                return row
+        return None
+
+    def fetch_domestic_order_fill(self, order_no: str):
+        """ 국내주식주문/주식일별주문체결조회 (오늘, 주문번호 지정)
+        Args:
+            order_no (str): 주문번호
+        """
+        path = "uapi/domestic-stock/v1/trading/inquire-daily-ccld"
+        url = f"{self.base_url}/{path}"
+        headers = {
+            "content-type": "application/json",
+            "authorization": self.access_token,
+            "appKey": self.api_key,
+            "appSecret": self.api_secret,
+            "tr_id": "VTTC8001R" if self.mock else "TTTC8001R"
+        }
+        today = datetime.datetime.now().strftime("%Y%m%d")
+        params = {
+            'CANO': self.acc_no_prefix,
+            'ACNT_PRDT_CD': self.acc_no_postfix,
+            'INQR_STRT_DT': today,
+            'INQR_END_DT': today,
+            'SLL_BUY_DVSN_CD': '00',
+            'INQR_DVSN': '00',
+            'PDNO': '',
+            'CCLD_DVSN': '00',
+            'ORD_GNO_BRNO': '',
+            'ODNO': order_no,
+            'INQR_DVSN_3': '00',
+            'INQR_DVSN_1': '',
+            'CTX_AREA_FK100': '',
+            'CTX_AREA_NK100': ''
+        }
+        resp = requests.get(url, headers=headers, params=params)
+        return resp.json()
+
+    def fetch_oversea_order_fill(self, order_no: str):
+        """ 해외주식주문/해외주식 주문체결내역 (오늘, 주문번호 지정)
+        Args:
+            order_no (str): 주문번호
+        """
+        path = "uapi/overseas-stock/v1/trading/inquire-ccnl"
+        url = f"{self.base_url}/{path}"
+        headers = {
+            "content-type": "application/json",
+            "authorization": self.access_token,
+            "appKey": self.api_key,
+            "appSecret": self.api_secret,
+            "tr_id": "VTTS3035R" if self.mock else "TTTS3035R"
+        }
+        today = datetime.datetime.now().strftime("%Y%m%d")
+        params = {
+            'CANO': self.acc_no_prefix,
+            'ACNT_PRDT_CD': self.acc_no_postfix,
+            'PDNO': '%',
+            'ORD_STRT_DT': today,
+            'ORD_END_DT': today,
+            'SLL_BUY_DVSN': '00',
+            'CCLD_NCCS_DVSN': '00',
+            'OVRS_EXCG_CD': '%',
+            'SORT_SQN': 'DS',
+            'ORD_DT': '',
+            'ORD_GNO_BRNO': '',
+            'ODNO': order_no,
+            'CTX_AREA_NK200': '',
+            'CTX_AREA_FK200': ''
+        }
+        resp = requests.get(url, headers=headers, params=params)
+        return resp.json()
@@ -1,7 +1,10 @@
 import os
 import streamlit as st
 # from dotenv import load_dotenv
-from kisapi import KoreaInvestment
+from kisapi import KoreaInvestment, RateLimiter
+from dataclient import DataServiceClient
+from symbols import SymbolMaster
+import tracing
 from pages import *
 
 
@@ -29,6 +32,16 @@ target_pct_usa = {
     'SBUX': 0.1
 }
 
+@st.cache_resource
+def load_symbols():
+    # 마스터 파일은 매 실행마다가 아니라 백그라운드에서 주기적으로 갱신
+    return SymbolMaster().start()
+
+@st.cache_resource
+def load_rate_limiter():
+    # 모든 세션의 국내/해외 클라이언트가 모의투자 호출 제한(초당 2건)을 공유
+    return RateLimiter(2)
+
 if __name__ == "__main__":
     # load_dotenv()
     # API_KEY = os.environ.get("SIMUL_KEY")
@@ -38,8 +51,18 @@ if __name__ == "__main__":
     API_SEC = st.secrets["SIMUL_SEC"]
     ACC_NUM = st.secrets["SIMUL_ACC"]
 
-    kis_kor = KoreaInvestment(api_key=API_KEY, api_secret=API_SEC, acc_no=ACC_NUM, mock=True)
-    kis_usa = KoreaInvestment(api_key=API_KEY, api_secret=API_SEC, acc_no=ACC_NUM, mock=True, exchange="미국전체")
+    symbols = load_symbols()
+
+    # 데이터 서비스(dataservice.py)가 떠 있으면 모든 세션이 그 프로세스의 클라이언트를 공유
+    DATA_SERVICE_URL = os.environ.get("DATA_SERVICE_URL")
+    if DATA_SERVICE_URL:
+        kis_kor = DataServiceClient(DATA_SERVICE_URL, symbols=symbols)
+        kis_usa = DataServiceClient(DATA_SERVICE_URL, exchange="미국전체", symbols=symbols)
+    else:
+        kis_kor = KoreaInvestment(api_key=API_KEY, api_secret=API_SEC, acc_no=ACC_NUM, mock=True, symbols=symbols)
+        kis_usa = KoreaInvestment(api_key=API_KEY, api_secret=API_SEC, acc_no=ACC_NUM, mock=True, exchange="미국전체", symbols=symbols)
+        kis_kor.set_rate_limiter(load_rate_limiter())
+        kis_usa.set_rate_limiter(load_rate_limiter())
 
     page_names_to_funcs = {
         "한국투자 Open API with Streamlit": intro,
@@ -50,8 +73,14 @@ if __name__ == "__main__":
     }
 
     demo_name = st.sidebar.selectbox("예시 선택", page_names_to_funcs.keys())
-    if "한국" in demo_name:
-        page_names_to_funcs[demo_name](page_names_to_funcs, kis_kor, target_pct_kor)
-    elif "미국" in demo_name:
-        page_names_to_funcs[demo_name](page_names_to_funcs, kis_usa, target_pct_usa)
+
+    # 단계별 실행 시간 추적 (TRACE_DIR가 있으면 Chrome trace 파일로 저장)
+    tracing.start(demo_name, detailed=st.sidebar.checkbox("상세 실행 시간"))
+    try:
+        if "한국" in demo_name:
+            page_names_to_funcs[demo_name](page_names_to_funcs, kis_kor, target_pct_kor)
+        elif "미국" in demo_name:
+            page_names_to_funcs[demo_name](page_names_to_funcs, kis_usa, target_pct_usa)
+    finally:
+        show_trace(tracing.finish(os.environ.get("TRACE_DIR")))
         
\ No newline at end of file
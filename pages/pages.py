@@ -4,7 +4,14 @@ import pandas as pd
 import streamlit as st
 import plotly.express as px
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from backtest import get_backtest_kor, get_backtest_usa
+from risk import bootstrap_risk, risk_summary
+from execution import orders_from_rebalance, execute_orders
+from tracing import span
+
+# 위험 분석은 화면을 막지 않도록 백그라운드에서 계산
+RISK_EXECUTOR = ThreadPoolExecutor(max_workers=2)
 
 
 def intro(page_names_to_funcs, kis, target_percents):
@@ -44,7 +51,8 @@ def rebalancing_kor(page_names_to_funcs, kis, target_percents):
     데이터 처리 작업 
     """
     # create a current portfolio dataframe
-    balance = kis.fetch_balance()
+    with span("fetch_balance"):
+        balance = kis.fetch_balance()
     pf_data = defaultdict(list)
     for comp in balance['output1']:
         pf_data['종목코드'].append(comp['pdno'])
@@ -56,11 +64,16 @@ def rebalancing_kor(page_names_to_funcs, kis, target_percents):
         pf_data['평가금액'].append(comp['evlu_amt'])
         pf_data['평가손익금액'].append(f"{comp['evlu_pfls_amt']}원")
         pf_data['평가손익율'].append(f"{comp['evlu_pfls_rt']}%")
-    pf_df = pd.DataFrame(pf_data)
+    with span("dataframe", detailed=True):
+        pf_df = pd.DataFrame(pf_data)
 
     # create a portfolio rebalancing dataframe
     total_buy = sum(float(comp['pchs_amt']) for comp in balance['output1'])
     total_value = sum(float(comp['evlu_amt']) for comp in balance['output1'])
+    # 목표비율의 종목명을 종목코드로 바꿔 보유종목과 코드로 맞춘다
+    symbols = kis.symbols
+    if symbols:
+        target_percents = {symbols.code(name): pct for name, pct in target_percents.items()}
     rb_data = defaultdict(list)
     for comp in balance['output1']:
         rb_data['종목코드'].append(comp['pdno'])
@@ -69,7 +82,8 @@ def rebalancing_kor(page_names_to_funcs, kis, target_percents):
         rb_data['보유수량'].append(f"{comp['hldg_qty']}주")
         rb_data['평가금액'].append(comp['evlu_amt'])
         
-        tg_rt = target_percents[comp['prdt_name']]
+        # 마스터에 없어 코드로 바꾸지 못한 종목은 종목명으로 찾는다
+        tg_rt = target_percents[comp['pdno'] if comp['pdno'] in target_percents else comp['prdt_name']]
         rb_data['목표비율'].append(f"{tg_rt * 100}%")
         
         cr_rt = round(float(comp['evlu_amt']) / total_value , 2)
@@ -78,7 +92,8 @@ def rebalancing_kor(page_names_to_funcs, kis, target_percents):
         diff_rt = round(cr_rt - tg_rt, 2)
         rb_data['차이'].append(f"{diff_rt * 100}%")
         rb_data['매수/매도'].append( round( -total_value * diff_rt / float(comp['prpr']) ) )
-    rb_df = pd.DataFrame(rb_data)
+    with span("dataframe", detailed=True):
+        rb_df = pd.DataFrame(rb_data)
     
     # create a total returns dataframe
     output = balance['output2'][0]
@@ -88,7 +103,8 @@ def rebalancing_kor(page_names_to_funcs, kis, target_percents):
         "총 평가손익": f'{"{:,}".format(int(output["evlu_pfls_smtl_amt"]))}원',
         "총 평가손익률": f'{round( ( int(total_value) - int(total_buy) ) / total_buy * 100 , 2)}%'
     }
-    total_df = pd.DataFrame.from_dict([total_data])
+    with span("dataframe", detailed=True):
+        total_df = pd.DataFrame.from_dict([total_data])
     
     """ 
     마크다운 작성
@@ -100,14 +116,16 @@ def rebalancing_kor(page_names_to_funcs, kis, target_percents):
     st.write(total_df)
     
     # visualize the portfolio with a pie chart
-    fig = px.pie(pf_df, values='평가금액', names='종목명')
-    st.plotly_chart(fig)
+    with span("pie_chart"):
+        fig = px.pie(pf_df, values='평가금액', names='종목명')
+        st.plotly_chart(fig)
     
     # Table
     st.write(pf_df)
     
     st.write('## 포트폴리오 리밸런싱')
     st.write(rb_df)
+    show_orders(kis, rb_df)
 
 
 def rebalancing_usa(page_names_to_funcs, kis, target_percents):
@@ -115,7 +133,8 @@ def rebalancing_usa(page_names_to_funcs, kis, target_percents):
     데이터 처리 작업 
     """
     # create a current portfolio dataframe
-    balance = kis.fetch_balance()
+    with span("fetch_balance"):
+        balance = kis.fetch_balance()
     pf_data = defaultdict(list)
     for comp in balance['output1']:
         pf_data['종목코드'].append(comp['ovrs_pdno'])
@@ -127,7 +146,8 @@ def rebalancing_usa(page_names_to_funcs, kis, target_percents):
         pf_data['평가금액'].append(round(float(comp['ovrs_stck_evlu_amt']), 2))
         pf_data['평가손익금액'].append(f"${round(float(comp['frcr_evlu_pfls_amt']), 2)}")
         pf_data['평가손익율'].append(f"{comp['evlu_pfls_rt']}%")
-    pf_df = pd.DataFrame(pf_data)
+    with span("dataframe", detailed=True):
+        pf_df = pd.DataFrame(pf_data)
 
     # create a portfolio rebalancing dataframe
     total_buy = sum(float(comp['frcr_pchs_amt1']) for comp in balance['output1'])
@@ -149,7 +169,8 @@ def rebalancing_usa(page_names_to_funcs, kis, target_percents):
         diff_rt = round(cr_rt - tg_rt, 2)
         rb_data['차이'].append(f"{diff_rt * 100}%")
         rb_data['매수/매도'].append( round( -total_value * diff_rt / float(comp['now_pric2']) ) )
-    rb_df = pd.DataFrame(rb_data)
+    with span("dataframe", detailed=True):
+        rb_df = pd.DataFrame(rb_data)
     
     # create a total returns dataframe
     total_data = {
@@ -158,7 +179,8 @@ def rebalancing_usa(page_names_to_funcs, kis, target_percents):
         "총 평가 손익": f'${"{:,}".format(round(float(total_value) - float(total_buy), 2))}',
         "총 평가 손익율": f'{round( ( int(total_value) - int(total_buy) ) / total_value * 100 , 2)}%'
     }
-    total_df = pd.DataFrame.from_dict([total_data])
+    with span("dataframe", detailed=True):
+        total_df = pd.DataFrame.from_dict([total_data])
     
     """ 
     마크다운 작성
@@ -170,14 +192,87 @@ def rebalancing_usa(page_names_to_funcs, kis, target_percents):
     st.write(total_df)
     
     # visualize the portfolio with a pie chart
-    fig = px.pie(pf_df, values='평가금액', names='종목명')
-    st.plotly_chart(fig)
+    with span("pie_chart"):
+        fig = px.pie(pf_df, values='평가금액', names='종목명')
+        st.plotly_chart(fig)
     
     # Table
     st.write(pf_df)
     
     st.write('## 포트폴리오 리밸런싱')
     st.write(rb_df)
+    show_orders(kis, rb_df)
+
+
+def show_trace(trace):
+    """ 이번 실행의 단계별 소요 시간을 사이드바에 flame 형태로 표시 """
+    if trace is None or not trace.events:
+        return
+    spans = trace.spans()
+    total = max(start + dur for _, _, start, dur, _ in spans)
+    lines = []
+    for name, depth, start, dur, args in spans:
+        bar = "█" * max(1, round(dur / total * 20))
+        label = f"{name} ({', '.join(map(str, args.values()))})" if args else name
+        lines.append(f"{'　' * depth}`{bar}` {label} {dur * 1000:.1f}ms")
+    with st.sidebar.expander(f"실행 시간 {total * 1000:.0f}ms"):
+        st.markdown("  \n".join(lines))
+
+
+def show_orders(kis, rb_df):
+    """ 리밸런싱 표대로 주문을 일괄 실행하고 주문별 결과/지연시간 표시 """
+    if not hasattr(kis, "create_order"):
+        return
+    if st.button("리밸런싱 주문 실행"):
+        with st.spinner("주문을 실행하고 있습니다"):
+            report = execute_orders(kis, orders_from_rebalance(rb_df), calls_per_sec=2 if kis.mock else 18)
+        st.write('## 주문 결과')
+        st.write(report)
+
+
+def suggest_tickers(kis, tickers):
+    """ 종목 마스터에 없는 입력은 접두어 검색 결과를 사이드바에 보여준다 """
+    if kis.symbols is None:
+        return
+    for ticker in tickers:
+        if ticker and kis.symbols.get(ticker) is None:
+            candidates = ", ".join(f"{s.name} ({s.code})" for s in kis.symbols.search(ticker, limit=5))
+            st.sidebar.caption(f"{ticker}: {candidates or '검색 결과 없음'}")
+
+
+def show_ingest(df):
+    """ 백그라운드 분봉 수집 상태 표시 """
+    if df.attrs.get('ingesting'):
+        st.info("분봉을 받고 있습니다. 지금까지 받은 날만 분봉 기준으로 계산했습니다. 잠시 후 새로고침 해 주세요.")
+    if df.attrs.get('ingest_error'):
+        st.warning(f"분봉을 받지 못했습니다 (새로고침하면 남은 날부터 다시 받습니다): {df.attrs['ingest_error']}")
+
+
+def show_risk(rors, key):
+    """ 백테스트 수익률의 부트스트랩 위험 분석 결과 표시 (계산이 끝나지 않았으면 안내만 표시) """
+    if not rors or not st.sidebar.checkbox("위험 분석 (부트스트랩 10,000회)"):
+        return
+    st.header("위험 분석")
+    jobs = st.session_state.setdefault("risk_jobs", {})
+    if key not in jobs:
+        jobs[key] = RISK_EXECUTOR.submit(bootstrap_risk, pd.DataFrame(rors))
+    job = jobs[key]
+    if not job.done():
+        st.info("위험 분석을 계산하고 있습니다. 잠시 후 새로고침 해 주세요.")
+        st.button("새로고침")
+        return
+
+    try:
+        dists = job.result()
+    except Exception as e:
+        # 실패한 작업은 지워서 다음 실행에서 다시 계산
+        del jobs[key]
+        st.error(f"위험 분석에 실패했습니다: {e}")
+        return
+    st.write(risk_summary(dists))
+    for ticker, dist in dists.items():
+        fig = px.histogram(dist, x="hpr", nbins=100, title=f"{ticker} 누적 수익률 분포")
+        st.plotly_chart(fig)
 
 
 def backtesting_kor(page_names_to_funcs, kis, target_percents=None):
@@ -191,21 +286,32 @@ def backtesting_kor(page_names_to_funcs, kis, target_percents=None):
     # Define the initial_investment, rebalancing frequency and threshold
     tickers = st.sidebar.text_input('종목 입력 - 콤마( , )로 구분', '000660, 247540, 122630, 233740')
     tickers = list(ticker.strip().upper() for ticker in tickers.split(","))
+    suggest_tickers(kis, tickers)
+    timeframe = st.sidebar.selectbox("봉 주기", ["D", "W", "M", "Y"])
+    # 분봉은 KIS 클라이언트로 직접 받을 때만 (데이터 서비스는 일/주/월/년봉만 제공)
+    intraday = hasattr(kis, "fetch_minute_ohlcv") and st.sidebar.checkbox("분봉 기준 체결 (일봉만)")
     
+    rors = {}
     for ticker in tickers:
         try:
-            df, stock_name = get_backtest_kor(kis, ticker, start_date, end_date)
-            st.header(f"{stock_name} ({ticker})")
-            mdd, hpr = st.columns(2)
-            with hpr:
-                st.subheader("누적 수익률")
-                st.markdown(f"**:red[{round(df['hpr'][-2]*100, 2)}] %**")
-            st.line_chart(df, y="hpr")
-            with mdd:
-                st.subheader("Max DrawDown")
-                st.write(f"**:red[{round(df['dd'].max(), 2)}] %**")
+            df, stock_name = get_backtest_kor(kis, ticker, start_date, end_date, timeframe, intraday)
+            with span("render", ticker=ticker):
+                st.header(f"{stock_name} ({ticker})")
+                show_ingest(df)
+                mdd, hpr = st.columns(2)
+                with hpr:
+                    st.subheader("누적 수익률")
+                    st.markdown(f"**:red[{round(df['hpr'][-2]*100, 2)}] %**")
+                with span("line_chart"):
+                    st.line_chart(df, y="hpr")
+                with mdd:
+                    st.subheader("Max DrawDown")
+                    st.write(f"**:red[{round(df['dd'].max(), 2)}] %**")
+            rors[ticker] = df['ror']
         except ValueError:
             st.subheader(f"{ticker} 종목의 정보를 불러올 수 없습니다.")
+    with span("risk"):
+        show_risk(rors, (kis.exchange, tuple(tickers), start_date, end_date, timeframe, intraday))
 
 
 def backtesting_usa(page_names_to_funcs, kis, target_percents=None):
@@ -219,19 +325,30 @@ def backtesting_usa(page_names_to_funcs, kis, target_percents=None):
     # Define the initial_investment, rebalancing frequency and threshold
     tickers = st.sidebar.text_input('종목 입력 - 콤마( , )로 구분', 'TQQQ, TSLA, NVDA')
     tickers = list(ticker.strip().upper() for ticker in tickers.split(","))
+    suggest_tickers(kis, tickers)
+    timeframe = st.sidebar.selectbox("봉 주기", ["D", "W", "M", "Y"])
+    # 분봉은 KIS 클라이언트로 직접 받을 때만 (데이터 서비스는 일/주/월/년봉만 제공)
+    intraday = hasattr(kis, "fetch_minute_ohlcv") and st.sidebar.checkbox("분봉 기준 체결 (일봉만)")
     
+    rors = {}
     for ticker in tickers:
         try:
-            df = get_backtest_usa(kis, ticker, start_date, end_date)
-            st.header(f"{ticker}")
-            mdd, hpr = st.columns(2)
-            with hpr:
-                st.subheader("누적 수익률")
-                st.markdown(f"**:red[{round(df['hpr'][-2]*100, 2)}] %**")
-            st.line_chart(df, y="hpr")
-            with mdd:
-                st.subheader("Max DrawDown")
-                st.write(f"**:red[{round(df['dd'].max(), 2)}] %**")
+            df = get_backtest_usa(kis, ticker, start_date, end_date, timeframe, intraday)
+            with span("render", ticker=ticker):
+                st.header(f"{ticker}")
+                show_ingest(df)
+                mdd, hpr = st.columns(2)
+                with hpr:
+                    st.subheader("누적 수익률")
+                    st.markdown(f"**:red[{round(df['hpr'][-2]*100, 2)}] %**")
+                with span("line_chart"):
+                    st.line_chart(df, y="hpr")
+                with mdd:
+                    st.subheader("Max DrawDown")
+                    st.write(f"**:red[{round(df['dd'].max(), 2)}] %**")
+            rors[ticker] = df['ror']
         except ValueError:
             st.subheader(f"{ticker} 종목의 정보를 불러올 수 없습니다.")
+    with span("risk"):
+        show_risk(rors, (kis.exchange, tuple(tickers), start_date, end_date, timeframe, intraday))
             
\ No newline at end of file
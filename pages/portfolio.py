@@ -0,0 +1,164 @@
+import numpy as np
+import pandas as pd
+
+
+# 리밸런싱 주기 -> pandas period 코드
+REBALANCE_FREQ = {
+    "D": "D",
+    "W": "W",
+    "M": "M",
+    "Q": "Q",
+    "Y": "Y"
+}
+
+def align_close(ohlcv, column='close'):
+    """ 종목별 OHLCV를 날짜 x 종목 종가 행렬로 정렬
+    Args:
+        ohlcv (dict): {종목: DataFrame} (get_backtest_kor/usa 결과 등)
+        column (str): 사용할 가격 컬럼
+    Returns:
+        DataFrame: 모든 종목의 가격이 존재하는 날부터 시작하는 종가 행렬
+    """
+    close = pd.DataFrame({ticker: df[column] for ticker, df in ohlcv.items()})
+    close.index = pd.to_datetime(close.index)
+    return close.sort_index().ffill().dropna()
+
+def weight_matrix(weights, tickers):
+    """ 목표비율 dict (또는 dict 리스트)를 (B, N) 행렬로 변환
+    Args:
+        weights (dict | list): target_pct_kor/target_pct_usa 형태의 dict 또는 그 리스트
+        tickers (list): close 행렬의 종목 순서
+    Returns:
+        ndarray: (B, N) 목표비율 행렬
+    Raises:
+        ValueError: tickers에 없는 종목(종목코드 대신 종목명 등)이 있거나 비율이 잘못된 경우
+    """
+    if isinstance(weights, dict):
+        weights = [weights]
+    for w in weights:
+        unknown = set(w) - set(tickers)
+        if unknown:
+            raise ValueError(f"가격이 없는 종목입니다: {', '.join(map(str, sorted(unknown)))}")
+    W = np.array([[w.get(ticker, 0.0) for ticker in tickers] for w in weights], dtype=float)
+    if (W < 0).any() or (W.sum(axis=1) > 1 + 1e-9).any():
+        raise ValueError("목표비율은 0 이상이고 합계가 1 이하여야 합니다.")
+    return W
+
+def rebalance_days(index, freq):
+    """ 달력 기준 리밸런싱 날짜의 위치 (각 주기의 첫 거래일)
+    Args:
+        index (DatetimeIndex): 거래일
+        freq (str | None): "D", "W", "M", "Q", "Y" 또는 None (첫날만)
+    Returns:
+        ndarray: 리밸런싱 위치
+    """
+    if freq is None:
+        return np.array([0])
+    period = index.to_period(REBALANCE_FREQ[freq]).asi8
+    first = np.r_[True, period[1:] != period[:-1]]
+    return np.flatnonzero(first)
+
+def simulate_portfolio(W, prices, rebalance, threshold=None, fee=0.0005, lot=1, initial=10_000_000):
+    """ 목표비율 행렬의 포트폴리오 시뮬레이션
+    리밸런싱 사이 구간은 보유수량이 고정이므로 (B, N) @ (N, L) 행렬곱으로 한 번에 평가하고,
+    리밸런싱 시점에서만 B개의 비율 세트를 함께 갱신한다.
+    Args:
+        W (ndarray): (B, N) 목표비율
+        prices (ndarray): (T, N) 가격
+        rebalance (ndarray): 리밸런싱 후보 위치 (0 포함, 오름차순)
+        threshold (float, optional): 목표비율과의 최대 괴리가 이 값을 넘을 때만 리밸런싱
+        fee (float): 거래대금 대비 수수료율
+        lot (int | ndarray): 종목별 매매 단위
+        initial (float): 초기 투자금
+    Returns:
+        tuple: (평가금액 (B, T), 누적 회전율 (B,), 리밸런싱 횟수 (B,))
+    """
+    B, N = W.shape
+    T = prices.shape[0]
+    lot = np.broadcast_to(np.asarray(lot, dtype=float), (N,))
+
+    holdings = np.zeros((B, N))
+    cash = np.full(B, float(initial))
+    equity = np.empty((B, T))
+    turnover = np.zeros(B)
+    trades = np.zeros(B, dtype=int)
+
+    bounds = np.r_[rebalance, T]
+    for k in range(len(rebalance)):
+        t, end = bounds[k], bounds[k + 1]
+        price = prices[t]
+        value = cash + holdings @ price
+
+        if threshold is None or k == 0:
+            mask = np.ones(B, dtype=bool)
+        else:
+            drift = holdings * price / value[:, None]
+            mask = np.abs(drift - W).max(axis=1) > threshold
+
+        if mask.any():
+            v = value[mask]
+            # 수수료를 감안해 정수 단위로 내림
+            target = np.floor(v[:, None] * W[mask] / (price * (1 + fee) * lot)) * lot
+            traded = np.abs(target - holdings[mask]) @ price
+            cash[mask] = v - target @ price - traded * fee
+            holdings[mask] = target
+            turnover[mask] += traded / v
+            trades[mask] += 1
+
+        equity[:, t:end] = cash[:, None] + holdings @ prices[t:end].T
+
+    return equity, turnover, trades
+
+def max_drawdown(equity):
+    """ 평가금액 행렬의 낙폭(%)
+    Args:
+        equity (ndarray): (B, T) 평가금액
+    Returns:
+        ndarray: (B, T) 낙폭
+    """
+    peak = np.maximum.accumulate(equity, axis=1)
+    return (peak - equity) / peak * 100
+
+def backtest_portfolio(weights, close, freq="M", threshold=None, fee=0.0005, lot=1, initial=10_000_000):
+    """ 단일 목표비율 포트폴리오 백테스트
+    Args:
+        weights (dict): 목표비율 (예: target_pct_usa)
+        close (DataFrame): align_close 결과
+        freq (str | None): 리밸런싱 주기 "D", "W", "M", "Q", "Y"
+        threshold (float, optional): 괴리 기준 리밸런싱 임계값
+    Returns:
+        DataFrame: equity, hpr, dd, turnover 컬럼 (backtest()와 같은 hpr/dd 정의)
+    """
+    W = weight_matrix(weights, close.columns)
+    rebalance = rebalance_days(close.index, freq) if freq or threshold is None else np.arange(len(close))
+    equity, turnover, _ = simulate_portfolio(W, close.to_numpy(dtype=float), rebalance, threshold, fee, lot, initial)
+
+    df = pd.DataFrame({'equity': equity[0]}, index=close.index)
+    df['hpr'] = df['equity'] / initial
+    df['dd'] = max_drawdown(equity)[0]
+    df.attrs['turnover'] = turnover[0]
+    return df
+
+def backtest_portfolios(weights_list, close, freq="M", threshold=None, fee=0.0005, lot=1, initial=10_000_000, batch=1024):
+    """ 여러 목표비율 세트를 batch 단위로 묶어 한 번에 백테스트
+    Args:
+        weights_list (list): 목표비율 dict 리스트
+        close (DataFrame): align_close 결과
+        batch (int): 한 번에 시뮬레이션할 비율 세트 수 (메모리 상한: batch x 거래일)
+    Returns:
+        DataFrame: 비율 세트별 hpr, mdd, turnover, rebalances
+    """
+    prices = close.to_numpy(dtype=float)
+    rebalance = rebalance_days(close.index, freq) if freq or threshold is None else np.arange(len(close))
+
+    summary = []
+    for i in range(0, len(weights_list), batch):
+        W = weight_matrix(weights_list[i:i + batch], close.columns)
+        equity, turnover, trades = simulate_portfolio(W, prices, rebalance, threshold, fee, lot, initial)
+        summary.append(pd.DataFrame({
+            'hpr': equity[:, -1] / initial,
+            'mdd': max_drawdown(equity).max(axis=1),
+            'turnover': turnover,
+            'rebalances': trades
+        }))
+    return pd.concat(summary, ignore_index=True)
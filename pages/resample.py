@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+
+# 일봉에서 만들 수 있는 주기 -> pandas period 코드
+PERIOD_CODE = {
+    "W": "W",
+    "M": "M",
+    "Y": "Y"
+}
+
+def is_derived(timeframe):
+    """ 일봉에서 만들 수 있는 주기인지 ("W", "M", "Y", "5D" 등) """
+    return timeframe in PERIOD_CODE or (timeframe.endswith("D") and timeframe[:-1].isdigit())
+
+def group_starts(index, timeframe):
+    """ 같은 봉에 속하는 거래일 구간의 시작 위치
+    데이터에는 해당 거래소의 거래일만 들어 있으므로 KRX/미국 휴장일은 자연히 빠지고,
+    주봉은 거래소 현지 날짜 기준 월~일 한 주로 묶는다.
+    Args:
+        index (DatetimeIndex): 오름차순 거래일
+        timeframe (str): "W", "M", "Y" 또는 "ND" (N 거래일봉, 첫 거래일부터 N개씩)
+    Returns:
+        ndarray: 각 봉의 시작 위치
+    """
+    if timeframe in PERIOD_CODE:
+        keys = index.to_period(PERIOD_CODE[timeframe]).asi8
+        return np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    n = int(timeframe[:-1])
+    if n < 1:
+        raise ValueError(f"잘못된 주기입니다: {timeframe}")
+    return np.arange(0, len(index), n)
+
+def resample_ohlcv(df, timeframe):
+    """ 일봉 DataFrame을 주/월/년/N일봉으로 변환
+    Args:
+        df (DataFrame): open, high, low, close(, volume) 컬럼의 일봉 (날짜 오름차순)
+        timeframe (str): "W", "M", "Y" 또는 "ND"
+    Returns:
+        DataFrame: 각 봉의 마지막 거래일을 인덱스로 하는 OHLCV
+    """
+    if len(df) == 0:
+        return df.copy()
+    index = pd.DatetimeIndex(df.index)
+    starts = group_starts(index, timeframe)
+    ends = np.r_[starts[1:] - 1, len(df) - 1]
+
+    data = {
+        'open': df['open'].to_numpy()[starts],
+        'high': np.maximum.reduceat(df['high'].to_numpy(), starts),
+        'low': np.minimum.reduceat(df['low'].to_numpy(), starts),
+        'close': df['close'].to_numpy()[ends]
+    }
+    if 'volume' in df:
+        data['volume'] = np.add.reduceat(df['volume'].to_numpy(), starts)
+    return pd.DataFrame(data, index=df.index[ends])
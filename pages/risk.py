@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+
+
+def sample_paths(ror, n, horizon, method, block, rng):
+    """ 수익률 행렬에서 n개의 경로 샘플링
+    Args:
+        ror (ndarray): (T, K) 기간 수익률 (backtest()의 ror, 1 = 보합)
+        n (int): 경로 수
+        horizon (int): 경로 길이
+        method (str): "block" (블록 부트스트랩), "iid" (단순 부트스트랩), "normal" (로그수익률 정규분포)
+        block (int): 블록 길이
+        rng (Generator): 난수 생성기
+    Returns:
+        ndarray: (n, horizon, K) 수익률 경로
+    """
+    T, K = ror.shape
+    if method == "normal":
+        log_ror = np.log(ror)
+        mu = log_ror.mean(axis=0)
+        chol = np.linalg.cholesky(np.cov(log_ror, rowvar=False).reshape(K, K) + 1e-12 * np.eye(K))
+        z = rng.standard_normal((n, horizon, K))
+        return np.exp(z @ chol.T + mu)
+
+    if method == "iid":
+        block = 1
+    block = min(block, T)
+    n_blocks = -(-horizon // block)
+    starts = rng.integers(0, T - block + 1, size=(n, n_blocks))
+    idx = (starts[:, :, None] + np.arange(block)).reshape(n, -1)[:, :horizon]
+    # 종목을 같은 날짜로 함께 뽑아 종목 간 상관관계를 유지
+    return ror[idx]
+
+def path_stats(paths):
+    """ 경로별 누적 수익률, MDD, 최장 회복기간
+    Args:
+        paths (ndarray): (n, horizon, K) 수익률 경로
+    Returns:
+        tuple: hpr (n, K), mdd % (n, K), 회복기간 (n, K, 고점 회복 전까지의 최장 기간, 끝까지 미회복이면 끝까지의 기간)
+    """
+    hpr = np.cumprod(paths, axis=1)
+    peak = np.maximum.accumulate(hpr, axis=1)
+    dd = (peak - hpr) / peak * 100
+
+    step = np.arange(paths.shape[1])[None, :, None]
+    underwater = hpr < peak
+    last_high = np.maximum.accumulate(np.where(underwater, -1, step), axis=1)
+    recovery = (step - last_high).max(axis=1)
+    return hpr[:, -1], dd.max(axis=1), recovery
+
+def bootstrap_risk(ror, n_paths=10000, horizon=None, method="block", block=20, chunk=1000, seed=None):
+    """ 백테스트 수익률의 부트스트랩/몬테카를로 위험 분석
+    chunk개 경로씩 나눠 계산하므로 메모리는 chunk x horizon x 종목 수 만큼만 쓴다.
+    Args:
+        ror (Series | DataFrame): 종목별 backtest()['ror'] (여러 종목이면 날짜 x 종목)
+        n_paths (int): 경로 수
+        horizon (int, optional): 경로 길이. 기본값은 원래 기간과 동일
+        method (str): "block", "iid", "normal"
+        block (int): 블록 부트스트랩의 블록 길이
+        chunk (int): 한 번에 계산할 경로 수
+        seed (int, optional): 난수 시드
+    Returns:
+        dict: {종목: DataFrame(hpr, mdd, recovery)}
+    """
+    if isinstance(ror, pd.Series):
+        ror = ror.to_frame(ror.name or 'ror')
+    ror = ror.fillna(1)
+    values = ror.to_numpy(dtype=float)
+    horizon = horizon or len(values)
+    rng = np.random.default_rng(seed)
+
+    results = [], [], []
+    for i in range(0, n_paths, chunk):
+        paths = sample_paths(values, min(chunk, n_paths - i), horizon, method, block, rng)
+        for result, stat in zip(results, path_stats(paths)):
+            result.append(stat)
+    hpr, mdd, recovery = (np.concatenate(result) for result in results)
+
+    return {
+        ticker: pd.DataFrame({'hpr': hpr[:, k], 'mdd': mdd[:, k], 'recovery': recovery[:, k]})
+        for k, ticker in enumerate(ror.columns)
+    }
+
+def risk_summary(dists, quantiles=(0.05, 0.5, 0.95)):
+    """ 분포 요약표
+    Args:
+        dists (dict): bootstrap_risk 결과
+        quantiles (tuple): 분위수
+    Returns:
+        DataFrame: (종목, 지표) x 분위수
+    """
+    return pd.concat({ticker: dist.quantile(list(quantiles)).T for ticker, dist in dists.items()})
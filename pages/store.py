@@ -0,0 +1,159 @@
+import os
+import pickle
+import datetime
+import threading
+import pandas as pd
+from resample import is_derived, resample_ohlcv
+from intraday import market_of, market_today
+
+
+class OHLCVStore:
+    """ 종목별 일봉 캐시
+
+    일봉만 API로 받아 저장하고 주/월/년/N일봉은 요청 구간의 일봉에서 그때그때 만든다.
+    """
+
+    def __init__(self, path: str = None, autosave: bool = True):
+        """ 생성자
+        Args:
+            path (str, optional): 캐시를 저장할 pickle 파일 경로. None이면 메모리에만 보관
+            autosave (bool): 일봉을 받을 때마다 파일에 저장. False면 save()를 직접 호출
+        """
+        self.path = path
+        self.autosave = autosave
+        self.lock = threading.Lock()
+        self.frames = {}    # (exchange, symbol, 'D') -> 일봉 DataFrame
+        self.ranges = {}    # (exchange, symbol) -> (start, end) 일봉 조회 완료 구간
+        self.names = {}     # (exchange, symbol) -> 종목명
+        self.flights = {}       # (exchange, symbol) -> 일봉 조회 중 잠금
+        self.fetched = {}       # (exchange, symbol) -> 마지막으로 받은 구간 (오늘 포함)
+        self.generations = {}   # (exchange, symbol) -> 일봉을 받은 횟수
+        if path and os.path.exists(path):
+            self.load()
+
+    def load(self):
+        """ 파일에서 캐시 불러오기 """
+        with open(self.path, "rb") as f:
+            data = pickle.load(f)
+        self.frames, self.ranges, self.names = data['frames'], data['ranges'], data['names']
+        # 예전 캐시 파일에 남아 있는 파생 봉은 버린다
+        self.frames = {key: frame for key, frame in self.frames.items() if key[2] == 'D'}
+
+    def dump(self):
+        """ 캐시를 파일에 저장 """
+        if not self.path:
+            return
+        with open(self.path, "wb") as f:
+            pickle.dump({'frames': self.frames, 'ranges': self.ranges, 'names': self.names}, f)
+
+    def save(self):
+        """ 캐시를 파일에 저장 (autosave=False일 때) """
+        with self.lock:
+            self.dump()
+
+    def cached(self, exchange: str, symbol: str, start, end, timeframe: str = 'D'):
+        """ API 호출 없이 캐시에 있는 봉만 조회
+        Returns:
+            DataFrame: 캐시에 일봉이 없으면 None
+        """
+        with self.lock:
+            daily = self.frames.get((exchange, symbol, 'D'))
+        if daily is None:
+            return None
+        return bars(daily, to_date(start), to_date(end), timeframe)
+
+    def daily(self, kis, symbol: str, start, end, fetch):
+        """ 일봉 조회. 캐시에 없는 앞/뒤 구간만 fetch로 받아 합친다.
+        Args:
+            kis (KoreaInvestment): API 클라이언트
+            symbol (str): 종목코드
+            start (date): 조회시작일자
+            end (date): 조회종료일자
+            fetch (callable): fetch(kis, symbol, start, end) -> DataFrame (attrs['name']에 종목명)
+        Returns:
+            DataFrame: [start, end] 구간의 일봉
+        """
+        start, end = to_date(start), to_date(end)
+        key = (kis.exchange, symbol)
+        with self.lock:
+            flight = self.flights.setdefault(key, threading.Lock())
+            generation = self.generations.get(key, 0)
+
+        # 같은 종목은 한 번에 하나만 API를 호출하고, 기다린 호출은 그동안 받은 구간을 다시 받지 않는다
+        with flight:
+            with self.lock:
+                covered = self.ranges.get(key)
+                if self.generations.get(key, 0) != generation:
+                    covered = self.fetched[key]     # 기다리는 동안 받은 구간은 오늘 봉까지 조회 완료
+
+            missing = []
+            if covered is None:
+                missing.append((start, end))
+            else:
+                if start < covered[0]:
+                    missing.append((start, covered[0] - datetime.timedelta(days=1)))
+                if end > covered[1]:
+                    missing.append((covered[1] + datetime.timedelta(days=1), end))
+
+            # API 호출은 store 잠금 밖에서 해서 다른 종목의 캐시 조회를 막지 않는다
+            parts = [fetch(kis, symbol, first, last) for first, last in missing]
+
+            with self.lock:
+                frame = self.frames.get(key + ('D',))
+                if parts:
+                    for part in parts:
+                        if part.attrs.get('name'):
+                            self.names[key] = part.attrs['name']
+                    frame = pd.concat(([] if frame is None else [frame]) + parts)
+                    frame = frame[~frame.index.duplicated(keep='last')].sort_index()
+                    self.frames[key + ('D',)] = frame
+
+                    # 오늘 봉은 장중에 바뀌므로 거래소 현지 날짜로 어제까지만 조회 완료로 기록
+                    covered = self.ranges.get(key)
+                    lo = start if covered is None else min(start, covered[0])
+                    hi = end if covered is None else max(end, covered[1])
+                    yesterday = market_today(market_of(kis)) - datetime.timedelta(days=1)
+                    self.ranges[key] = (lo, min(hi, yesterday))
+                    self.fetched[key] = (lo, hi)
+                    self.generations[key] = self.generations.get(key, 0) + 1
+
+                    if self.autosave:
+                        self.dump()
+
+        return between(frame, start, end)
+
+    def ohlcv(self, kis, symbol: str, start, end, fetch, timeframe: str = 'D'):
+        """ 일/주/월/년/N일봉 조회 (일봉 외에는 API 호출 없이 캐시된 일봉에서 생성)
+        Args:
+            timeframe (str): "D", "W", "M", "Y" 또는 "ND"
+        Returns:
+            DataFrame: [start, end] 구간의 일봉만으로 만든 봉
+        """
+        if timeframe != 'D' and not is_derived(timeframe):
+            raise ValueError(f"지원하지 않는 주기입니다: {timeframe}")
+        daily = self.daily(kis, symbol, start, end, fetch)
+        return daily if timeframe == 'D' else resample_ohlcv(daily, timeframe)
+
+    def name(self, kis, symbol: str):
+        """ 캐시된 종목명 """
+        return self.names.get((kis.exchange, symbol))
+
+
+def to_date(d):
+    """ date/datetime/str(YYYYMMDD) -> date """
+    return pd.Timestamp(d).date()
+
+def between(df, start, end):
+    """ 인덱스가 [start, end] 안에 있는 행 """
+    return df[(df.index >= start) & (df.index <= end)]
+
+def bars(daily, start, end, timeframe='D'):
+    """ [start, end] 구간의 일봉만으로 만든 봉
+    캐시에 앞선 일봉이 있는지와 관계없이 같은 요청은 같은 봉이 되도록,
+    첫 봉은 start부터 시작하고 N일봉은 start 이후 첫 거래일부터 N개씩 묶는다.
+    """
+    daily = between(daily, start, end)
+    return daily if timeframe == 'D' else resample_ohlcv(daily, timeframe)
+
+
+STORE = OHLCVStore(os.environ.get("OHLCV_STORE"))
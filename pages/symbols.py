@@ -0,0 +1,199 @@
+import io
+import os
+import time
+import bisect
+import zipfile
+import threading
+import requests
+from collections import namedtuple
+
+
+MASTER_URL = "https://new.real.download.dws.co.kr/common/master"
+
+# 마스터 파일 -> (시장, 파일 끝의 고정폭 영역 길이). 해외 파일은 탭 구분이라 None
+MASTER_FILES = {
+    "kospi_code.mst": ("KOSPI", 228),
+    "kosdaq_code.mst": ("KOSDAQ", 222),
+    "nasmst.cod": ("NAS", None),
+    "nysmst.cod": ("NYS", None),
+    "amsmst.cod": ("AMS", None)
+}
+
+# 시세 조회용 거래소 코드 -> 주문/잔고용 거래소 코드
+ORDER_EXCHANGE = {
+    "NAS": "NASD",
+    "NYS": "NYSE",
+    "AMS": "AMEX"
+}
+
+Symbol = namedtuple("Symbol", ["code", "name", "exchange", "english"])
+
+
+def parse_domestic(text, tail, market):
+    """ 국내 마스터 (고정폭) 파싱: 단축코드(9) 표준코드(12) 한글명 + 고정폭 영역 """
+    for row in text.splitlines():
+        head = row[:len(row) - tail]
+        code, name = head[0:9].rstrip(), head[21:].strip()
+        if code:
+            yield Symbol(code, name, market, "")
+
+def parse_oversea(text, market):
+    """ 해외 마스터 (탭 구분) 파싱: 컬럼 2 거래소코드, 4 심볼, 6/7 한글/영문명 """
+    for row in text.splitlines():
+        cols = row.split("\t")
+        if len(cols) > 7 and cols[4]:
+            yield Symbol(cols[4].strip(), cols[6].strip(), cols[2].strip() or market, cols[7].strip())
+
+
+class SymbolMaster:
+    """ 한국투자증권 종목 마스터 (종목코드 <-> 종목명 <-> 거래소) """
+
+    def __init__(self, path: str = "master", max_age: int = 24 * 60 * 60, download: bool = True,
+                 timeout: float = 10, retry: int = 10 * 60):
+        """ 생성자
+        Args:
+            path (str): 마스터 파일(압축 해제본)을 둘 디렉토리
+            max_age (int): 이 시간(초)보다 오래된 파일만 다시 받는다
+            download (bool): False면 로컬 파일만 사용 (테스트용 fixture 등)
+            timeout (float): 다운로드 timeout(초)
+            retry (int): 다운로드에 실패하면 이 시간(초) 동안 다시 받지 않는다
+        """
+        self.path = path
+        self.max_age = max_age
+        self.download = download
+        self.timeout = timeout
+        self.retry = retry
+        self.retry_at = 0.0
+        self.lock = threading.Lock()
+        self.refreshing = threading.Lock()
+        self.by_code = {}
+        self.by_name = {}
+        self.keys = []      # (소문자 검색어, 종목코드) 정렬 리스트
+        self.loaded = {}    # 파일명 -> 읽어들인 파일의 mtime
+        self.refresh()
+
+    def start(self, interval: int = 60 * 60):
+        """ interval(초)마다 백그라운드 스레드에서 refresh """
+        def run():
+            while True:
+                time.sleep(interval)
+                self.refresh()
+        threading.Thread(target=run, daemon=True).start()
+        return self
+
+    def refresh(self):
+        """ 오래됐거나 바뀐 마스터 파일만 다시 받아 해당 시장의 종목만 교체
+        다른 스레드가 refresh 중이면 기다리지 않고 돌아간다.
+        """
+        if not self.refreshing.acquire(blocking=False):
+            return
+        try:
+            if self.download and time.time() >= self.retry_at:
+                self.fetch_stale()
+            self.reload()
+        finally:
+            self.refreshing.release()
+
+    def fetch_stale(self):
+        """ 오래된 마스터 파일 다운로드. 실패하면 retry 동안 다운로드를 건너뛴다 """
+        for filename in MASTER_FILES:
+            if not self.is_stale(os.path.join(self.path, filename)):
+                continue
+            try:
+                self.fetch(filename)
+            except (requests.RequestException, zipfile.BadZipFile):
+                self.retry_at = time.time() + self.retry
+                return      # 받지 못하면 기존 파일 사용
+
+    def reload(self):
+        """ 읽어들인 뒤 바뀐 마스터 파일만 다시 읽기 """
+        changed = False
+        with self.lock:
+            for filename, (market, tail) in MASTER_FILES.items():
+                filepath = os.path.join(self.path, filename)
+                if not os.path.exists(filepath):
+                    continue
+                mtime = os.path.getmtime(filepath)
+                if self.loaded.get(filename) == mtime:
+                    continue
+
+                with open(filepath, encoding="cp949", errors="replace") as f:
+                    text = f.read()
+                rows = parse_domestic(text, tail, market) if tail else parse_oversea(text, market)
+
+                self.drop(market)
+                for symbol in rows:
+                    self.by_code[symbol.code] = symbol
+                    self.by_name[symbol.name] = symbol
+                self.loaded[filename] = mtime
+                changed = True
+
+            if changed:
+                keys = set()
+                for symbol in self.by_code.values():
+                    keys.add((symbol.code.lower(), symbol.code))
+                    keys.add((symbol.name.lower(), symbol.code))
+                    if symbol.english:
+                        keys.add((symbol.english.lower(), symbol.code))
+                self.keys = sorted(keys)
+
+    def is_stale(self, filepath):
+        """ 파일이 없거나 max_age보다 오래됐는지 """
+        return not os.path.exists(filepath) or time.time() - os.path.getmtime(filepath) > self.max_age
+
+    def fetch(self, filename):
+        """ 마스터 파일 zip 다운로드 및 압축 해제 """
+        resp = requests.get(f"{MASTER_URL}/{filename}.zip", timeout=self.timeout)
+        resp.raise_for_status()
+        os.makedirs(self.path, exist_ok=True)
+        with zipfile.ZipFile(io.BytesIO(resp.content)) as z:
+            z.extract(filename, self.path)
+
+    def drop(self, market):
+        """ 특정 시장(거래소)의 종목 제거 """
+        for code in [code for code, symbol in self.by_code.items() if symbol.exchange == market]:
+            symbol = self.by_code.pop(code)
+            if self.by_name.get(symbol.name) is symbol:
+                del self.by_name[symbol.name]
+
+    def get(self, key: str):
+        """ 종목코드 또는 종목명으로 조회
+        Returns:
+            Symbol: 없으면 None
+        """
+        return self.by_code.get(key) or self.by_name.get(key)
+
+    def code(self, key: str):
+        """ 종목코드 (모르면 입력값 그대로) """
+        symbol = self.get(key)
+        return symbol.code if symbol else key
+
+    def name(self, key: str):
+        """ 종목명 (모르면 입력값 그대로) """
+        symbol = self.get(key)
+        return symbol.name if symbol else key
+
+    def exchange(self, key: str, default: str = None):
+        """ 거래소 코드 (KOSPI, KOSDAQ, NAS, NYS, AMS) """
+        symbol = self.get(key)
+        return symbol.exchange if symbol else default
+
+    def search(self, prefix: str, limit: int = 10):
+        """ 종목코드/한글명/영문명 접두어 검색
+        Args:
+            prefix (str): 검색어
+            limit (int): 최대 결과 수
+        Returns:
+            list: Symbol 리스트
+        """
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        result = []
+        i = bisect.bisect_left(self.keys, (prefix, ""))
+        while i < len(self.keys) and len(result) < limit and self.keys[i][0].startswith(prefix):
+            symbol = self.by_code[self.keys[i][1]]
+            if symbol not in result:
+                result.append(symbol)
+            i += 1
+        return result
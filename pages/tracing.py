@@ -0,0 +1,94 @@
+""" 페이지 단계별 실행 시간 추적
+
+Streamlit은 세션마다 별도 스레드에서 스크립트를 다시 실행하므로 추적 기록을 스레드별로 둔다.
+start()로 시작한 스레드에서만 span이 기록되고, 그 외에는 아무것도 하지 않는다.
+detailed=True인 span은 상세 모드일 때만 기록한다.
+"""
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+
+_local = threading.local()
+
+
+class Trace:
+    """ 한 번의 실행(rerun) 동안의 span 기록 """
+
+    def __init__(self, name: str, detailed: bool = False):
+        self.name = name
+        self.detailed = detailed
+        self.origin = time.perf_counter()
+        self.wall = time.time()
+        self.events = []    # (이름, 깊이, 시작(초), 길이(초), 인자)
+        self.stack = []
+
+    def spans(self):
+        """ 시작 시각 순으로 정렬한 span """
+        return sorted(self.events, key=lambda event: (event[2], event[1]))
+
+    def to_chrome(self):
+        """ Chrome trace (chrome://tracing, Perfetto) 형식 """
+        pid, tid = os.getpid(), threading.get_ident()
+        return {
+            "traceEvents": [
+                {"name": name, "ph": "X", "ts": start * 1e6, "dur": dur * 1e6, "pid": pid, "tid": tid, "args": args}
+                for name, depth, start, dur, args in self.spans()
+            ],
+            "otherData": {"name": self.name, "detailed": self.detailed}
+        }
+
+    def export(self, trace_dir: str):
+        """ trace_dir에 Chrome trace JSON 파일로 저장
+        Returns:
+            str: 저장한 파일 경로
+        """
+        os.makedirs(trace_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.wall))
+        path = os.path.join(trace_dir, f"trace-{stamp}-{int(self.wall * 1000) % 1000:03d}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome(), f, ensure_ascii=False, default=str)
+        return path
+
+
+def start(name: str = "rerun", detailed: bool = False):
+    """ 현재 스레드에서 새 추적 시작 """
+    _local.trace = Trace(name, detailed)
+    return _local.trace
+
+def current():
+    return getattr(_local, "trace", None)
+
+def finish(trace_dir: str = None):
+    """ 현재 스레드의 추적 종료. trace_dir가 있으면 파일로 저장
+    Returns:
+        Trace: 종료한 추적 (시작하지 않았으면 None)
+    """
+    trace = current()
+    _local.trace = None
+    if trace is not None and trace_dir:
+        trace.export(trace_dir)
+    return trace
+
+@contextmanager
+def span(name: str, detailed: bool = False, **args):
+    """ 구간 실행 시간 기록
+    Args:
+        name (str): 구간 이름
+        detailed (bool): True면 상세 모드에서만 기록
+        args: trace 파일에 함께 남길 값
+    """
+    trace = current()
+    if trace is None or (detailed and not trace.detailed):
+        yield
+        return
+    trace.stack.append(name)
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        t1 = time.perf_counter()
+        trace.stack.pop()
+        trace.events.append((name, len(trace.stack), t0 - trace.origin, t1 - t0, args))
@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+
+def precompute(df, windows):
+    """ 종목 하나의 지표 행렬을 한 번만 계산
+    이동평균은 종가 누적합의 차이로 모든 기간을 한 번에 구한다 (backtest()의 ma5, range와 같은 정의).
+    Args:
+        df (DataFrame): open, high, low, close 일봉
+        windows (list): 이동평균 기간 후보
+    Returns:
+        dict: open, high, close (T,), range (전일 고가-저가, T), bull (len(windows), T), index
+    """
+    o, h, l, c = (df[col].to_numpy(dtype=float) for col in ('open', 'high', 'low', 'close'))
+    T = len(c)
+    windows = np.asarray(windows)
+
+    # ma[i, t] = 전일까지 windows[i]일 종가 평균 = (cs[t] - cs[t - w]) / w
+    cs = np.r_[0.0, np.cumsum(c)]
+    t = np.arange(T)[None, :]
+    lag = t - windows[:, None]
+    ma = (cs[t] - cs[np.maximum(lag, 0)]) / windows[:, None]
+    ma[lag < 0] = np.nan
+
+    return {
+        'open': o,
+        'high': h,
+        'close': c,
+        'range': np.r_[np.nan, (h - l)[:-1]],
+        'bull': o > ma,
+        'index': df.index
+    }
+
+def ror_matrix(ind, ks, fee=0.0005):
+    """ 모든 (k, window) 조합의 일별 수익률
+    Args:
+        ind (dict): precompute 결과
+        ks (list): 변동성 돌파 계수 후보
+        fee (float): 수수료
+    Returns:
+        ndarray: (len(ks) * len(windows), T) 수익률 (k가 바깥, window가 안쪽 순서)
+    """
+    target = ind['open'] + np.asarray(ks)[:, None] * ind['range']
+    hit = ind['high'] > target
+    ror = np.where(hit[:, None, :] & ind['bull'][None, :, :], (ind['close'] / target)[:, None, :] - fee, 1.0)
+    return ror.reshape(-1, ror.shape[-1])
+
+def fold_bounds(T, train, test):
+    """ (학습 시작, 검증 시작, 검증 끝) 배열. test 간격으로 학습 구간을 밀어간다 """
+    a = np.arange(0, T - train, test)
+    b = a + train
+    return a, b, np.minimum(b + test, T)
+
+def walk_forward(df, ks, windows, train=250, test=60, fee=0.0005, objective="hpr"):
+    """ 종목 하나의 walk-forward 최적화
+    학습 구간마다 (k, window) 중 objective가 가장 좋은 조합을 골라 바로 다음 검증 구간에 적용한다.
+    모든 구간의 점수는 로그수익률 누적합의 차이로 한 번에 계산한다.
+    Args:
+        df (DataFrame): open, high, low, close 일봉
+        ks (list): 변동성 돌파 계수 후보
+        windows (list): 이동평균 기간 후보
+        train (int): 학습 구간 길이(봉)
+        test (int): 검증 구간 길이(봉)
+        fee (float): 수수료
+        objective (str): "hpr" (누적 수익률) 또는 "sharpe"
+    Returns:
+        tuple: (검증 구간을 이어붙인 hpr Series, 구간별 결과 DataFrame)
+    """
+    params = [(k, w) for k in ks for w in windows]
+    lr = np.log(np.maximum(ror_matrix(precompute(df, windows), ks, fee), 1e-12))
+    T = lr.shape[1]
+    a, b, e = fold_bounds(T, train, test)
+    if len(a) == 0:
+        raise ValueError(f"데이터가 부족합니다 ({T}개 < 학습 {train} + 검증)")
+
+    C = np.concatenate([np.zeros((len(params), 1)), np.cumsum(lr, axis=1)], axis=1)
+    score = C[:, b] - C[:, a]
+    if objective == "sharpe":
+        C2 = np.concatenate([np.zeros((len(params), 1)), np.cumsum(lr ** 2, axis=1)], axis=1)
+        mean = score / train
+        var = (C2[:, b] - C2[:, a]) / train - mean ** 2
+        score = mean / np.sqrt(np.maximum(var, 1e-18))
+    best = score.argmax(axis=0)
+
+    # 검증 구간의 로그수익률을 이어붙여 하나의 곡선으로
+    oos = np.concatenate([lr[p, s:f] for p, s, f in zip(best, b, e)])
+    equity = pd.Series(np.exp(np.cumsum(oos)), index=df.index[b[0]:e[-1]], name='hpr')
+
+    rows = []
+    for i, (p, s0, s, f) in enumerate(zip(best, a, b, e)):
+        hpr = np.exp(np.cumsum(lr[p, s:f]))
+        peak = np.maximum.accumulate(np.r_[1.0, hpr])[1:]
+        rows.append({
+            'fold': i,
+            'train_start': df.index[s0],
+            'test_start': df.index[s],
+            'test_end': df.index[f - 1],
+            'k': params[p][0],
+            'window': params[p][1],
+            'is_hpr': float(np.exp(C[p, s] - C[p, s0])),
+            'is_score': float(score[p, i]),
+            'oos_hpr': float(hpr[-1]),
+            'oos_mdd': float(((peak - hpr) / peak).max() * 100)
+        })
+    return equity, pd.DataFrame(rows)
+
+def walk_forward_universe(frames, ks, windows, train=250, test=60, fee=0.0005, objective="hpr", workers=4):
+    """ 여러 종목 walk-forward (종목별 지표 행렬은 종목마다 한 번만 계산)
+    Args:
+        frames (dict): {종목: 일봉 DataFrame}
+        workers (int): 동시에 계산할 종목 수
+    Returns:
+        tuple: (날짜 x 종목 검증 구간 hpr DataFrame, 종목별 구간 결과 DataFrame)
+    """
+    def run(item):
+        ticker, df = item
+        try:
+            return ticker, walk_forward(df, ks, windows, train, test, fee, objective)
+        except ValueError:
+            return ticker, None
+
+    curves, folds = {}, []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for ticker, result in pool.map(run, frames.items()):
+            if result is None:
+                continue
+            curves[ticker] = result[0]
+            folds.append(result[1].assign(ticker=ticker))
+    if not folds:
+        return pd.DataFrame(), pd.DataFrame()
+    return pd.DataFrame(curves), pd.concat(folds, ignore_index=True)
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# 앱 모듈은 pages/ 안에서 서로 모듈 이름으로 import 한다
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "pages"))
+
+FIXTURES = os.path.join(ROOT, "fixtures")
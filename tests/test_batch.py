@@ -0,0 +1,49 @@
+import json
+import pytest
+from batch import read_checkpoint, open_checkpoint, remaining
+
+PARAMS = {"market": "kor", "start": "2023-01-02", "end": "2023-06-30", "timeframe": "D", "k": "0.5", "window": "5", "fee": "0.0015"}
+
+
+def test_errors_are_retried(tmp_path):
+    path = tmp_path / "results.parquet.ckpt.jsonl"
+    rows = [
+        {"params": PARAMS},
+        {"ticker": "005930", "status": "ok", "error": ""},
+        {"ticker": "000660", "status": "error", "error": "초당 거래건수를 초과하였습니다."},
+        {"ticker": "247540", "status": "error", "error": "timeout"},
+        {"ticker": "247540", "status": "ok", "error": ""}
+    ]
+    path.write_text("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows) + '{"ticker": "12', encoding="utf-8")
+
+    params, done = read_checkpoint(str(path))
+    assert params == PARAMS
+    assert done["247540"]["status"] == "ok"
+    assert remaining(["005930", "000660", "247540", "122630", "122630"], done) == ["000660", "122630"]
+
+def test_checkpoint_params_must_match(tmp_path):
+    path = str(tmp_path / "results.parquet.ckpt.jsonl")
+    with open_checkpoint(path, PARAMS)[0] as f:
+        f.write(json.dumps({"ticker": "005930", "status": "ok", "error": ""}) + "\n")
+
+    # 같은 설정이면 이어서 실행
+    f, done = open_checkpoint(path, dict(PARAMS))
+    f.close()
+    assert list(done) == ["005930"]
+
+    # 설정이 다르면 이어서 실행하지 않는다
+    other = dict(PARAMS, k="0.6")
+    with pytest.raises(ValueError):
+        open_checkpoint(path, other)
+
+    # fresh면 새 설정으로 처음부터
+    f, done = open_checkpoint(path, other, fresh=True)
+    f.close()
+    assert done == {}
+    assert read_checkpoint(path) == (other, {})
+
+def test_checkpoint_without_params_is_not_resumed(tmp_path):
+    path = tmp_path / "results.parquet.ckpt.jsonl"
+    path.write_text(json.dumps({"ticker": "005930", "status": "ok", "error": ""}) + "\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        open_checkpoint(str(path), PARAMS)
@@ -0,0 +1,142 @@
+import time
+import threading
+import datetime
+import pandas as pd
+import pytest
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+from dataservice import SingleFlight
+from store import OHLCVStore
+
+
+def test_singleflight_dedups_concurrent_calls():
+    flight = SingleFlight()
+    calls = []
+    def slow():
+        calls.append(1)
+        time.sleep(0.2)
+        return len(calls)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda _: flight.do("key", slow), range(4)))
+    assert calls == [1]
+    assert results == [1] * 4
+    assert flight.do("key", slow) == 2     # 끝난 뒤에는 다시 호출
+
+def test_singleflight_shares_errors():
+    flight = SingleFlight()
+    def fail():
+        time.sleep(0.1)
+        raise ValueError("boom")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futures = [pool.submit(flight.do, "key", fail) for _ in range(2)]
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result()
+    assert flight.calls == {}
+
+
+def counting_fetch(calls):
+    lock = threading.Lock()
+    def fetch(kis, symbol, start, end):
+        with lock:
+            calls.append((symbol, start, end))
+        time.sleep(0.2)
+        days = pd.bdate_range(start, end)
+        df = pd.DataFrame({'open': 1.0, 'high': 2.0, 'low': 0.5, 'close': 1.5, 'volume': 10.0},
+                          index=[d.date() for d in days])
+        df.attrs['name'] = symbol
+        return df
+    return fetch
+
+def test_store_fetches_symbol_once():
+    store, calls = OHLCVStore(), []
+    kis = SimpleNamespace(exchange="서울")
+    fetch = counting_fetch(calls)
+    start, end = datetime.date(2022, 1, 1), datetime.date(2022, 12, 31)
+    requests = [(start, end, 'D'), (start, end, 'D'), (start, end, 'W'), (datetime.date(2022, 3, 1), end, 'M')]
+
+    with ThreadPoolExecutor(max_workers=len(requests)) as pool:
+        frames = list(pool.map(lambda r: store.ohlcv(kis, "005930", r[0], r[1], fetch, r[2]), requests))
+    # 겹치는 구간은 한 번만 받는다 (먼저 시작한 요청에 따라 한 번 또는 앞/뒤 두 번)
+    spans = sorted((first, last) for _, first, last in calls)
+    assert spans[0][0] == start and spans[-1][1] == end
+    assert all(a[1] < b[0] for a, b in zip(spans, spans[1:]))
+    assert len(calls) <= 2
+    assert len(frames[0]) == len(frames[1]) == len(pd.bdate_range(start, end))
+    assert frames[2].index[-1] == frames[0].index[-1]
+
+def test_store_fetches_only_missing_range():
+    store, calls = OHLCVStore(), []
+    kis = SimpleNamespace(exchange="서울")
+    fetch = counting_fetch(calls)
+    store.ohlcv(kis, "005930", datetime.date(2022, 3, 1), datetime.date(2022, 6, 30), fetch)
+    df = store.ohlcv(kis, "005930", datetime.date(2022, 1, 1), datetime.date(2022, 6, 30), fetch)
+    assert calls[1] == ("005930", datetime.date(2022, 1, 1), datetime.date(2022, 2, 28))
+    assert df.index[0] == datetime.date(2022, 1, 3)
+    assert store.cached("서울", "005930", "20220101", "20220630", 'W') is not None
+
+def test_store_waiters_reuse_todays_bar():
+    store, calls = OHLCVStore(), []
+    kis = SimpleNamespace(exchange="미국전체")
+    fetch = counting_fetch(calls)
+    end = datetime.date.today()
+    start = end - datetime.timedelta(days=30)
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        list(pool.map(lambda _: store.ohlcv(kis, "TSLA", start, end, fetch), range(3)))
+    assert len(calls) == 1
+    store.ohlcv(kis, "TSLA", start, end, fetch)
+    assert len(calls) == 2      # 나중 조회는 오늘 봉을 다시 받는다
+
+def test_store_bars_do_not_depend_on_cache():
+    kis = SimpleNamespace(exchange="서울")
+    fetch = counting_fetch([])
+    start, end = datetime.date(2022, 3, 15), datetime.date(2022, 8, 31)
+
+    fresh = OHLCVStore()
+    expected = {tf: fresh.ohlcv(kis, "005930", start, end, fetch, tf) for tf in ("M", "5D")}
+    warm = OHLCVStore()
+    warm.ohlcv(kis, "005930", datetime.date(2022, 1, 1), end, fetch)
+    for tf, df in expected.items():
+        pd.testing.assert_frame_equal(warm.ohlcv(kis, "005930", start, end, fetch, tf), df)
+        pd.testing.assert_frame_equal(warm.cached("서울", "005930", start, end, tf), df)
+    assert expected["5D"].index[0] == datetime.date(2022, 3, 21)   # 3/15(화)부터 5거래일
+
+def test_store_coverage_uses_exchange_date(monkeypatch):
+    import store
+    monkeypatch.setattr(store, "market_today", lambda market: datetime.date(2023, 5, 10) if market == "usa" else datetime.date(2023, 5, 11))
+    kis = SimpleNamespace(exchange="미국전체")
+    s = OHLCVStore()
+    s.ohlcv(kis, "TSLA", datetime.date(2023, 5, 1), datetime.date(2023, 5, 11), counting_fetch([]))
+    assert s.ranges[("미국전체", "TSLA")][1] == datetime.date(2023, 5, 9)
+
+def test_token_refreshed_and_shared(tmp_path, monkeypatch):
+    import pickle
+    import requests
+    from kisapi import KoreaInvestment
+    monkeypatch.chdir(tmp_path)
+    issued = []
+    def post(url, headers=None, data=None):
+        issued.append(url)
+        return SimpleNamespace(json=lambda: {"access_token": f"token{len(issued)}", "expires_in": 86400})
+    monkeypatch.setattr(requests, "post", post)
+
+    kor = KoreaInvestment("key", "secret", "12345678-01", mock=True)
+    usa = KoreaInvestment("key", "secret", "12345678-01", exchange="미국전체", mock=True)
+    assert len(issued) == 1 and kor.access_token == usa.access_token == "Bearer token1"
+
+    kor.refresh_access_token()
+    assert len(issued) == 1
+
+    # 만료가 다가오면 한 클라이언트만 새로 받고 다른 클라이언트는 그 토큰을 불러온다
+    with open("token.dat", "rb") as f:
+        data = pickle.load(f)
+    data['timestamp'] = int(time.time()) + 60
+    with open("token.dat", "wb") as f:
+        pickle.dump(data, f)
+    kor.token_expire = usa.token_expire = data['timestamp']
+    kor.refresh_access_token()
+    usa.refresh_access_token()
+    assert len(issued) == 2 and kor.access_token == usa.access_token == "Bearer token2"
@@ -0,0 +1,130 @@
+import pandas as pd
+import pytest
+import requests
+from execution import Order, PaperBroker, orders_from_rebalance, execute_orders
+from kisapi import KoreaInvestment
+
+
+class FlakyBroker(PaperBroker):
+    """ 첫 번째 체결조회마다 네트워크 오류를 내는 브로커 """
+
+    def __init__(self, fail_always=()):
+        super().__init__()
+        self.submitted = []
+        self.polled = set()
+        self.fail_always = set(fail_always)
+
+    def create_order(self, side, symbol, price, quantity, order_type="00"):
+        self.submitted.append((side, symbol))
+        return super().create_order(side, symbol, price, quantity, order_type)
+
+    def fetch_order_fill(self, order_no):
+        if order_no in self.fail_always or order_no not in self.polled:
+            self.polled.add(order_no)
+            raise requests.ConnectionError("connection reset")
+        return super().fetch_order_fill(order_no)
+
+
+def test_orders_from_rebalance_sells_first():
+    rb_df = pd.DataFrame({
+        '종목코드': ['000660', '005930', '247540'],
+        '현재가': ['90000원', '60,000원', '$12.5'],
+        '매수/매도': [3, -2, 0]
+    })
+    orders = orders_from_rebalance(rb_df)
+    assert orders == [Order('005930', 'sell', 2, 60000.0), Order('000660', 'buy', 3, 90000.0)]
+
+def test_execute_orders_paper_broker():
+    orders = [Order('005930', 'sell', 2, 60000.0), Order('000660', 'buy', 3, 90000.0)]
+    report = execute_orders(PaperBroker(), orders, calls_per_sec=1000, poll=0)
+    assert list(report['status']) == ["filled", "filled"]
+    assert list(report['side']) == ["sell", "buy"]
+    assert list(report['filled']) == [2, 3]
+    assert report['submit_ms'].notna().all() and report['fill_ms'].notna().all()
+
+def test_poll_errors_do_not_stop_batch():
+    broker = FlakyBroker(fail_always={"0000000001"})
+    orders = [Order('005930', 'sell', 2, 60000.0), Order('000660', 'sell', 1, 90000.0), Order('247540', 'buy', 3, 100.0)]
+    report = execute_orders(broker, orders, calls_per_sec=1000, workers=2, poll=0, timeout=0.05)
+    assert [side for side, _ in broker.submitted] == ['sell', 'sell', 'buy']
+    status = dict(zip(report['order_no'], report['status']))
+    assert status == {"0000000001": "error", "0000000002": "filled", "0000000003": "filled"}
+    assert "connection reset" in report.set_index('order_no').loc["0000000001", 'msg']
+
+
+def client(exchange):
+    kis = KoreaInvestment.__new__(KoreaInvestment)
+    kis.exchange = exchange
+    return kis
+
+def test_order_fill_matches_order_number():
+    kis = client("서울")
+    kis.fetch_domestic_order_fill = lambda order_no: {"rt_cd": "0", "output1": [
+        {"odno": "0000011111", "ord_qty": "5", "tot_ccld_qty": "5", "avg_prvs": "100"},
+        {"odno": "0000022222", "ord_qty": "3", "tot_ccld_qty": "1", "avg_prvs": "200"}
+    ]}
+    assert kis.fetch_order_fill("0000022222") == {"quantity": 3, "filled": 1, "price": 200.0}
+    assert kis.fetch_order_fill("33333") == {"quantity": 0, "filled": 0, "price": 0.0}
+
+    kis = client("미국전체")
+    kis.fetch_oversea_order_fill = lambda order_no: {"rt_cd": "0", "output": [
+        {"odno": "0030000001", "ft_ord_qty": "2", "ft_ccld_qty": "0", "ft_ccld_unpr3": ""},
+        {"odno": "0030000002", "ft_ord_qty": "4", "ft_ccld_qty": "4", "ft_ccld_unpr3": "12.5"}
+    ]}
+    assert kis.fetch_order_fill("30000002") == {"quantity": 4, "filled": 4, "price": 12.5}
+
+def test_order_fill_error_response():
+    kis = client("서울")
+    kis.fetch_domestic_order_fill = lambda order_no: {"rt_cd": "1", "msg_cd": "EGW00201", "msg1": "초당 거래건수를 초과하였습니다."}
+    with pytest.raises(ValueError, match="EGW00201"):
+        kis.fetch_order_fill("1")
+
+
+class CountingLimiter:
+    def __init__(self):
+        self.calls = 0
+
+    def acquire(self):
+        self.calls += 1
+
+class BusyBroker(PaperBroker):
+    """ 처음 두 번의 주문은 호출 제한(EGW00201)으로 거부하고, 클라이언트 공유 limiter를 거치는 브로커 """
+
+    def __init__(self):
+        super().__init__()
+        self.limiter = CountingLimiter()
+        self.rejected = 0
+
+    def create_order(self, side, symbol, price, quantity, order_type="00"):
+        self.limiter.acquire()
+        if self.rejected < 2:
+            self.rejected += 1
+            return {"rt_cd": "1", "msg_cd": "EGW00201", "msg1": "초당 거래건수를 초과하였습니다."}
+        return super().create_order(side, symbol, price, quantity, order_type)
+
+    def fetch_order_fill(self, order_no):
+        self.limiter.acquire()
+        return super().fetch_order_fill(order_no)
+
+def test_rate_limited_orders_are_retried():
+    broker = BusyBroker()
+    report = execute_orders(broker, [Order('005930', 'buy', 1, 60000.0)], calls_per_sec=1, poll=0)
+    assert list(report['status']) == ["filled"]
+    # 공유 limiter만 거친다 (주문 3번 + 체결조회 1번)
+    assert broker.limiter.calls == 4
+
+def test_order_methods_are_rate_limited(monkeypatch):
+    from kisapi import RateLimiter
+    methods = ("create_domestic_order", "create_oversea_order", "fetch_domestic_order_fill", "fetch_oversea_order_fill")
+    for method in methods:
+        monkeypatch.setattr(KoreaInvestment, method, lambda self, *args: {"rt_cd": "0"})
+    limiter = RateLimiter(1000)
+    acquired = []
+    monkeypatch.setattr(limiter, "acquire", lambda: acquired.append(1))
+
+    kis = client("서울")
+    kis.set_rate_limiter(limiter)
+    for method in methods:
+        getattr(kis, method)("1")
+    assert len(acquired) == len(methods)
+    assert kis.limiter is limiter
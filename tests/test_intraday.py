@@ -0,0 +1,165 @@
+import datetime
+import pandas as pd
+import pytest
+from intraday import MinuteStore, IngestJobs, first_crossing, missing_runs
+
+KOR_DAYS = [datetime.date(2023, 1, d) for d in (2, 3, 4, 5, 6)] + [datetime.date(2023, 2, 1)]
+
+
+def session(day, open_="0900", close="1530"):
+    start = datetime.datetime.combine(day, datetime.datetime.strptime(open_, "%H%M").time())
+    end = datetime.datetime.combine(day, datetime.datetime.strptime(close, "%H%M").time())
+    return list(pd.date_range(start, end, freq="min").to_pydatetime())
+
+class FakeKor:
+    """ 주식일별분봉조회 흉내. fail_after번째 호출부터 호출 제한 오류 """
+    exchange = "서울"
+
+    def __init__(self, days, fail_after=None):
+        self.minutes = {day: session(day) for day in days}
+        self.fail_after = fail_after
+        self.calls = 0
+
+    def fetch_minute_ohlcv(self, symbol, day="", hour=""):
+        self.calls += 1
+        if self.fail_after is not None and self.calls > self.fail_after:
+            return {"rt_cd": "1", "msg_cd": "EGW00201", "msg1": "초당 거래건수를 초과하였습니다."}
+        day = datetime.datetime.strptime(day, "%Y%m%d").date()
+        times = [t for t in self.minutes.get(day, []) if t.strftime("%H%M%S") <= hour][::-1][:120]
+        return {"rt_cd": "0", "output2": [{
+            "stck_bsop_date": t.strftime("%Y%m%d"), "stck_cntg_hour": t.strftime("%H%M%S"),
+            "stck_oprc": "100", "stck_hgpr": "101", "stck_lwpr": "99", "stck_prpr": "100", "cntg_vol": "1"
+        } for t in times]}
+
+class FakeUsa:
+    """ 해외주식분봉조회 흉내 (최근부터 KEYB 연속조회) """
+    exchange = "미국전체"
+
+    def __init__(self, days):
+        self.minutes = sorted((t for day in days for t in session(day, "0930", "1559")), reverse=True)
+        self.calls = 0
+
+    def fetch_minute_ohlcv(self, symbol, next_key=""):
+        self.calls += 1
+        times = [t for t in self.minutes if not next_key or t.strftime("%Y%m%d%H%M%S") < next_key][:120]
+        return {"rt_cd": "0", "output2": [{
+            "xymd": t.strftime("%Y%m%d"), "xhms": t.strftime("%H%M%S"),
+            "open": "10", "high": "11", "low": "9", "last": "10", "evol": "1"
+        } for t in times]}
+
+
+def test_ingest_kor(tmp_path):
+    store = MinuteStore(str(tmp_path))
+    store.ingest(FakeKor(KOR_DAYS), "005930", KOR_DAYS)
+    chunks = list(store.iter_chunks("kor", "005930", KOR_DAYS[0], KOR_DAYS[-1]))
+    assert [len(chunk) for chunk in chunks] == [5 * 391, 391]
+    assert (tmp_path / "kor" / "005930" / "2023-02.parquet").exists()
+
+def test_ingest_error_keeps_only_complete_days(tmp_path):
+    store = MinuteStore(str(tmp_path))
+    # 하루에 4번 조회하므로 두 번째 날 중간에 실패
+    with pytest.raises(ValueError, match="EGW00201"):
+        store.ingest(FakeKor(KOR_DAYS, fail_after=5), "005930", KOR_DAYS)
+    assert store.stored_days("kor", "005930", KOR_DAYS[0], KOR_DAYS[-1]) == {KOR_DAYS[0]}
+
+    kis = FakeKor(KOR_DAYS)
+    store.ingest(kis, "005930", KOR_DAYS)
+    assert kis.calls == 4 * (len(KOR_DAYS) - 1)
+    assert store.stored_days("kor", "005930", KOR_DAYS[0], KOR_DAYS[-1]) == set(KOR_DAYS)
+
+def test_ingest_remembers_empty_days(tmp_path):
+    store = MinuteStore(str(tmp_path))
+    halted = [datetime.date(2023, 1, d) for d in (9, 10, 11)]
+    days = KOR_DAYS[:2] + halted
+    kis = FakeKor(KOR_DAYS[:2])
+    store.ingest(kis, "005930", days)
+    calls = kis.calls
+    store.ingest(kis, "005930", days)
+    assert kis.calls == calls
+    assert store.empty_days("kor", "005930") == set(halted)
+
+def test_ingest_does_not_mark_days_before_history(tmp_path):
+    store = MinuteStore(str(tmp_path))
+    old = [datetime.date(2022, 12, d) for d in (28, 29)]
+    kis = FakeKor(KOR_DAYS[:2])
+    store.ingest(kis, "005930", old + KOR_DAYS[:2])
+    assert store.empty_days("kor", "005930") == set()
+    assert store.stored_days("kor", "005930", old[0], KOR_DAYS[1]) == set(KOR_DAYS[:2])
+
+def test_ingest_skips_unfinished_day(tmp_path):
+    store = MinuteStore(str(tmp_path))
+    kis = FakeKor([])
+    store.ingest(kis, "005930", [datetime.date.today() + datetime.timedelta(days=1)])
+    assert kis.calls == 0
+
+def test_ingest_usa_by_month(tmp_path):
+    days = [datetime.date(2023, 1, 30), datetime.date(2023, 1, 31), datetime.date(2023, 2, 1), datetime.date(2023, 2, 2)]
+    store = MinuteStore(str(tmp_path))
+    kis = FakeUsa(days)
+    wanted = days[1:] + [datetime.date(2023, 2, 3)]
+    store.ingest(kis, "TSLA", wanted)
+    assert store.stored_days("usa", "TSLA", days[0], wanted[-1]) == set(wanted)
+    chunks = list(store.iter_chunks("usa", "TSLA", days[0], wanted[-1]))
+    assert [len(chunk) for chunk in chunks] == [390, 2 * 390]
+    assert store.empty_days("usa", "TSLA") == {datetime.date(2023, 2, 3)}
+
+def test_ingest_usa_pages_only_missing_window(tmp_path):
+    days = [datetime.date(2023, 3, d) for d in (1, 2, 3, 6, 7, 8, 9, 10)]
+    store = MinuteStore(str(tmp_path))
+    kis = FakeUsa([datetime.date(2023, 2, 28)] + days)
+    store.ingest(kis, "TSLA", days[:2])
+    # 3/3 0시부터 거슬러 올라가 2/28에 닿을 때까지 120개씩 (390분봉 x 2일 = 780개)
+    assert kis.calls == 7
+
+    kis.calls = 0
+    store.ingest(kis, "TSLA", days[:3])
+    assert kis.calls == 4      # 3/3 하루치만 (3/4 0시부터 3/2에 닿을 때까지)
+    assert store.stored_days("usa", "TSLA", datetime.date(2023, 2, 1), days[-1]) == set(days[:3])
+
+def test_ingest_usa_history_limit(tmp_path):
+    days = [datetime.date(2023, 3, d) for d in (6, 7, 8)]
+    store = MinuteStore(str(tmp_path))
+    kis = FakeUsa(days)
+    kis.minutes = [t for t in kis.minutes if t >= datetime.datetime(2023, 3, 7, 12, 0)]    # 3/7 12시 이전은 조회 불가
+    store.ingest(kis, "TSLA", days)
+    assert store.stored_days("usa", "TSLA", days[0], days[-1]) == {days[2]}
+    assert store.empty_days("usa", "TSLA") == set()
+
+def test_background_ingest(tmp_path):
+    store = MinuteStore(str(tmp_path))
+    jobs = IngestJobs(store)
+    kis = FakeKor(KOR_DAYS)
+    job = jobs.submit(kis, "005930", KOR_DAYS)
+    assert jobs.submit(kis, "005930", KOR_DAYS) is job or job.done()
+    job.result(timeout=10)
+    assert store.stored_days("kor", "005930", KOR_DAYS[0], KOR_DAYS[-1]) == set(KOR_DAYS)
+
+    failing = jobs.submit(FakeKor([KOR_DAYS[0]], fail_after=0), "000660", KOR_DAYS)
+    with pytest.raises(ValueError):
+        failing.result(timeout=10)
+    assert jobs.submit(FakeKor(KOR_DAYS), "000660", KOR_DAYS) is not failing
+
+def test_missing_runs():
+    days = KOR_DAYS
+    assert missing_runs(days, {days[2]}) == [days[:2], days[3:]]
+    assert missing_runs(days, set(days)) == []
+
+def test_first_crossing():
+    day = KOR_DAYS[0]
+    times = session(day, "0900", "0904")
+    chunk = pd.DataFrame({
+        'time': times,
+        'open': [100, 101, 104, 103, 102.0],
+        'high': [101, 103, 106, 104, 103.0],
+        'low': [99, 100, 103, 102, 101.0],
+        'close': [100, 102, 105, 103, 102.0],
+        'volume': [1.0] * 5
+    })
+    target = pd.Series({day: 102.5, KOR_DAYS[1]: 90.0})
+    result = first_crossing(target, [chunk])
+    assert result.loc[day, 'entry'] == 102.5
+    assert result.loc[day, 'entry_time'] == times[1]
+
+    result = first_crossing(pd.Series({day: 103.5}), [chunk])
+    assert result.loc[day, 'entry'] == 104     # 시가가 목표가 위면 시가에 체결
+    assert first_crossing(target, []).empty
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+from portfolio import (align_close, weight_matrix, rebalance_days, simulate_portfolio,
+                       backtest_portfolio, backtest_portfolios)
+
+
+def prices(T=300, N=4, seed=2):
+    rng = np.random.default_rng(seed)
+    close = 50 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, (T, N)), axis=0))
+    return pd.DataFrame(close, index=pd.bdate_range("2021-01-01", periods=T), columns=list("ABCD")[:N])
+
+def reference(w, prices, rebalance, threshold, fee, lot, initial):
+    """ 하루씩 보유수량을 갱신하는 단순 시뮬레이션 """
+    T, N = prices.shape
+    lot = np.broadcast_to(np.asarray(lot, dtype=float), (N,))
+    holdings, cash = np.zeros(N), float(initial)
+    equity, turnover, trades = [], 0.0, 0
+    candidates = set(rebalance)
+    for t in range(T):
+        price = prices[t]
+        if t in candidates:
+            value = cash + holdings @ price
+            if threshold is None or t == rebalance[0] or np.abs(holdings * price / value - w).max() > threshold:
+                target = np.floor(value * w / (price * (1 + fee) * lot)) * lot
+                traded = np.abs(target - holdings) @ price
+                cash = value - target @ price - traded * fee
+                holdings = target
+                turnover += traded / value
+                trades += 1
+        equity.append(cash + holdings @ price)
+    return np.array(equity), turnover, trades
+
+WEIGHTS = [
+    {"A": 0.25, "B": 0.25, "C": 0.25, "D": 0.25},
+    {"A": 0.6, "B": 0.4},
+    {"C": 1.0},
+    {"A": 0.1, "B": 0.2, "C": 0.3}
+]
+
+@pytest.mark.parametrize("freq, threshold, fee, lot", [
+    ("M", None, 0.0005, 1),
+    ("W", None, 0.003, 10),
+    ("D", 0.05, 0.001, 1),
+    (None, None, 0.0, np.array([1, 5, 10, 100]))
+])
+def test_matches_daily_loop(freq, threshold, fee, lot):
+    close = prices()
+    p = close.to_numpy()
+    rebalance = rebalance_days(close.index, freq)
+    W = weight_matrix(WEIGHTS, close.columns)
+    equity, turnover, trades = simulate_portfolio(W, p, rebalance, threshold, fee, lot, initial=1_000_000)
+    for b, w in enumerate(W):
+        eq, to, tr = reference(w, p, rebalance, threshold, fee, lot, 1_000_000)
+        np.testing.assert_allclose(equity[b], eq)
+        assert turnover[b] == pytest.approx(to)
+        assert trades[b] == tr
+
+def test_threshold_rebalances_less():
+    close = prices()
+    W = weight_matrix(WEIGHTS[:1], close.columns)
+    every = rebalance_days(close.index, "D")
+    _, _, daily = simulate_portfolio(W, close.to_numpy(), every)
+    _, _, drift = simulate_portfolio(W, close.to_numpy(), every, threshold=0.05)
+    assert daily[0] == len(close) and 1 < drift[0] < daily[0]
+
+def test_batches_match_single_runs():
+    close = prices()
+    summary = backtest_portfolios(WEIGHTS, close, freq="M", batch=3)
+    assert len(summary) == len(WEIGHTS)
+    for i, w in enumerate(WEIGHTS):
+        df = backtest_portfolio(w, close, freq="M")
+        assert summary['hpr'][i] == pytest.approx(df['hpr'].iloc[-1])
+        assert summary['mdd'][i] == pytest.approx(df['dd'].max())
+        assert summary['turnover'][i] == pytest.approx(df.attrs['turnover'])
+
+def test_weight_validation():
+    close = prices()
+    with pytest.raises(ValueError, match="SK하이닉스"):
+        weight_matrix({"SK하이닉스": 0.2, "A": 0.1}, close.columns)
+    with pytest.raises(ValueError):
+        weight_matrix({"A": 0.7, "B": 0.7}, close.columns)
+    with pytest.raises(ValueError):
+        weight_matrix({"A": -0.1}, close.columns)
+
+def test_align_close():
+    a = pd.DataFrame({'close': [1.0, 2.0, 3.0]}, index=[d.date() for d in pd.bdate_range("2023-01-02", periods=3)])
+    b = pd.DataFrame({'close': [5.0, 6.0]}, index=a.index[1:])
+    close = align_close({"A": a, "B": b})
+    assert list(close.columns) == ["A", "B"] and len(close) == 2
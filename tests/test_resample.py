@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+from resample import resample_ohlcv
+
+AGG = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+RULES = {"W": ["W-SUN"], "M": ["ME", "M"], "Y": ["YE", "A"]}
+
+
+def daily(n=800, seed=0):
+    """ 휴장일이 섞인 거래일 일봉 """
+    rng = np.random.default_rng(seed)
+    days = pd.bdate_range("2019-01-01", periods=int(n * 1.2) + 10)
+    days = days[rng.random(len(days)) > 0.08][:n]
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, len(days))))
+    open_ = close * np.exp(rng.normal(0, 0.01, len(days)))
+    return pd.DataFrame({
+        'open': open_,
+        'high': np.maximum(open_, close) * 1.01,
+        'low': np.minimum(open_, close) * 0.99,
+        'close': close,
+        'volume': rng.integers(1, 1000, len(days)).astype(float)
+    }, index=[d.date() for d in days])
+
+def pandas_resample(df, timeframe):
+    frame = df.set_axis(pd.DatetimeIndex(df.index))
+    for rule in RULES[timeframe]:
+        try:
+            grouped = frame.resample(rule)
+            break
+        except ValueError:
+            continue
+    expected = grouped.agg(AGG).dropna()
+    last = frame.index.to_series().resample(rule).max().dropna()
+    return expected.set_axis([d.date() for d in last])
+
+@pytest.mark.parametrize("timeframe", ["W", "M", "Y"])
+def test_matches_pandas_resample(timeframe):
+    df = daily()
+    result = resample_ohlcv(df, timeframe)
+    expected = pandas_resample(df, timeframe)
+    assert list(result.index) == list(expected.index)
+    np.testing.assert_allclose(result[list(AGG)].to_numpy(), expected[list(AGG)].to_numpy())
+
+def test_n_day_bars():
+    df = daily(23)
+    result = resample_ohlcv(df, "5D")
+    assert len(result) == 5
+    assert result.index[-1] == df.index[-1]
+    assert result['high'].iloc[0] == df['high'].iloc[:5].max()
+    assert result['volume'].sum() == df['volume'].sum()
+
+def test_empty_and_invalid():
+    assert resample_ohlcv(daily().iloc[:0], "W").empty
+    with pytest.raises(ValueError):
+        resample_ohlcv(daily(), "0D")
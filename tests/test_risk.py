@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+from risk import path_stats, bootstrap_risk, risk_summary
+
+
+def test_path_stats_hand_worked():
+    # 1.1 -> 0.99 -> 0.792 -> 1.188 -> 1.307 : 고점 1.1에서 28% 하락, 3번째 기간에 회복
+    up = [1.1, 0.9, 0.8, 1.5, 1.1]
+    # 1.0 -> 0.5 -> 0.5 -> 0.6 : 첫 기간부터 끝까지 미회복
+    down = [1.0, 0.5, 1.0, 1.2, 1.0]
+    paths = np.array([up, down]).T[None, :, :]
+    hpr, mdd, recovery = path_stats(paths)
+
+    np.testing.assert_allclose(hpr[0], [1.1 * 0.9 * 0.8 * 1.5 * 1.1, 0.6])
+    np.testing.assert_allclose(mdd[0], [28.0, 50.0])
+    assert list(recovery[0]) == [2, 4]
+
+def test_path_stats_no_drawdown():
+    hpr, mdd, recovery = path_stats(np.full((1, 4, 1), 1.01))
+    assert hpr[0, 0] == pytest.approx(1.01 ** 4)
+    assert mdd[0, 0] == 0 and recovery[0, 0] == 0
+
+def ror(T=250, seed=3):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'A': np.where(rng.random(T) < 0.4, rng.normal(1.002, 0.02, T), 1.0),
+        'B': np.where(rng.random(T) < 0.4, rng.normal(1.0, 0.03, T), 1.0)
+    })
+
+@pytest.mark.parametrize("method", ["block", "iid", "normal"])
+def test_chunked_matches_one_pass(method):
+    one = bootstrap_risk(ror(), n_paths=900, method=method, chunk=900, seed=7)
+    chunked = bootstrap_risk(ror(), n_paths=900, method=method, chunk=128, seed=7)
+    for ticker in one:
+        pd.testing.assert_frame_equal(one[ticker], chunked[ticker])
+    assert set(one) == {"A", "B"} and len(one["A"]) == 900
+
+def test_summary_shape():
+    dists = bootstrap_risk(ror()['A'], n_paths=200, horizon=60, seed=1)
+    summary = risk_summary(dists)
+    assert list(summary.columns) == [0.05, 0.5, 0.95]
+    assert list(summary.index.get_level_values(1)) == ['hpr', 'mdd', 'recovery']
@@ -0,0 +1,55 @@
+import shutil
+import requests
+from conftest import FIXTURES
+from symbols import SymbolMaster
+
+
+def load(path=f"{FIXTURES}/master"):
+    return SymbolMaster(path, download=False)
+
+def test_parse_domestic():
+    master = load()
+    assert master.get("000660").name == "SK하이닉스"
+    assert master.get("SK하이닉스").code == "000660"
+    assert master.exchange("247540") == "KOSDAQ"
+    assert master.code("KODEX 코스닥150레버리지") == "233740"
+
+def test_parse_oversea():
+    master = load()
+    assert master.exchange("T") == "NYS"
+    assert master.exchange("TSLA") == "NAS"
+    assert master.exchange("SPY") == "AMS"
+    assert master.get("NVDA").english == "NVIDIA CORP"
+
+def test_unknown_symbol():
+    master = load()
+    assert master.get("없는종목") is None
+    assert master.code("없는종목") == "없는종목"
+    assert master.exchange("ZZZZ", "NAS") == "NAS"
+
+def test_search_prefix():
+    master = load()
+    assert [s.code for s in master.search("에코프로")] == ["086520", "247540"]
+    assert [s.code for s in master.search("tes")] == ["TSLA"]
+    assert [s.code for s in master.search("kodex", limit=1)] == ["122630"]
+    assert master.search("  ") == []
+
+def test_missing_master():
+    master = load("/nonexistent")
+    assert master.get("000660") is None
+    assert master.code("SK하이닉스") == "SK하이닉스"
+
+def test_download_backoff(tmp_path, monkeypatch):
+    calls = []
+    def unreachable(url, timeout=None):
+        calls.append(timeout)
+        raise requests.ConnectionError(url)
+    monkeypatch.setattr(requests, "get", unreachable)
+
+    master = SymbolMaster(str(tmp_path), timeout=1)
+    master.refresh()
+    assert calls == [1]     # 실패 후 retry 동안은 다시 받지 않는다
+
+    shutil.copytree(f"{FIXTURES}/master", tmp_path, dirs_exist_ok=True)
+    master.refresh()
+    assert master.get("TSLA").exchange == "NAS"
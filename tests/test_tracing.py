@@ -0,0 +1,67 @@
+import json
+import threading
+import tracing
+from tracing import span
+
+
+def test_nesting_depth():
+    tracing.start("page")
+    with span("fetch", ticker="005930"):
+        with span("api"):
+            pass
+        with span("dataframe"):
+            with span("sort"):
+                pass
+    with span("render"):
+        pass
+    trace = tracing.finish()
+
+    assert [(name, depth) for name, depth, *_ in trace.spans()] == [
+        ("fetch", 0), ("api", 1), ("dataframe", 1), ("sort", 2), ("render", 0)
+    ]
+    fetch = trace.spans()[0]
+    assert fetch[4] == {"ticker": "005930"}
+    assert all(fetch[2] <= start and start + dur <= fetch[2] + fetch[3] for _, depth, start, dur, _ in trace.spans()[1:4])
+
+def test_detailed_spans_only_in_detailed_mode():
+    tracing.start("page", detailed=False)
+    with span("fetch"):
+        with span("api", detailed=True):
+            pass
+    assert [event[0] for event in tracing.finish().spans()] == ["fetch"]
+
+    tracing.start("page", detailed=True)
+    with span("fetch"):
+        with span("api", detailed=True):
+            pass
+    assert [event[0] for event in tracing.finish().spans()] == ["fetch", "api"]
+
+def test_no_trace_outside_started_thread():
+    tracing.start("page")
+    seen = []
+    thread = threading.Thread(target=lambda: seen.append(tracing.current()))
+    thread.start()
+    thread.join()
+    with span("fetch"):
+        pass
+    assert seen == [None] and len(tracing.finish().events) == 1
+    with span("ignored"):
+        pass
+    assert tracing.current() is None
+
+def test_chrome_trace(tmp_path):
+    tracing.start("한국주식 백테스팅", detailed=True)
+    with span("backtest", ticker="000660"):
+        pass
+    trace = tracing.finish(str(tmp_path))
+
+    chrome = trace.to_chrome()
+    assert chrome["otherData"] == {"name": "한국주식 백테스팅", "detailed": True}
+    (event,) = chrome["traceEvents"]
+    assert event["name"] == "backtest" and event["ph"] == "X"
+    assert event["args"] == {"ticker": "000660"}
+    assert event["ts"] >= 0 and event["dur"] >= 0
+    assert {"pid", "tid"} <= set(event)
+
+    (path,) = tmp_path.iterdir()
+    assert json.loads(path.read_text(encoding="utf-8")) == json.loads(json.dumps(chrome))
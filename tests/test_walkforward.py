@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+import pytest
+from backtest import backtest
+from walkforward import precompute, ror_matrix, walk_forward, walk_forward_universe
+
+
+def daily(n=700, seed=1):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0005, 0.02, n)))
+    open_ = close * np.exp(rng.normal(0, 0.01, n))
+    return pd.DataFrame({
+        'open': open_,
+        'high': np.maximum(open_, close) * (1 + rng.random(n) * 0.02),
+        'low': np.minimum(open_, close) * (1 - rng.random(n) * 0.02),
+        'close': close
+    }, index=[d.date() for d in pd.bdate_range("2020-01-01", periods=n)])
+
+def test_ror_matrix_matches_backtest():
+    df = daily()
+    ks, windows = [0.3, 0.5, 0.8], [3, 5, 20]
+    ror = ror_matrix(precompute(df, windows), ks, fee=0.001)
+    for i, (k, window) in enumerate((k, w) for k in ks for w in windows):
+        expected = backtest(df.copy(), k=k, window=window, fee=0.001)['ror'].to_numpy()
+        np.testing.assert_allclose(ror[i], expected)
+
+def test_walk_forward_folds():
+    df = daily()
+    equity, folds = walk_forward(df, [0.3, 0.5], [3, 5], train=250, test=60)
+    assert len(folds) == 8
+    assert equity.index[0] == df.index[250] and equity.index[-1] == df.index[-1]
+    assert equity.iloc[-1] == pytest.approx(folds['oos_hpr'].prod())
+
+def test_walk_forward_short_history():
+    with pytest.raises(ValueError):
+        walk_forward(daily(100), [0.5], [5])
+    curves, folds = walk_forward_universe({"A": daily(), "B": daily(100)}, [0.5], [5])
+    assert list(curves.columns) == ["A"] and set(folds['ticker']) == {"A"}